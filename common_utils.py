@@ -12,6 +12,7 @@ import re
 from typing import Dict, List, Optional, Union, Any
 from pathlib import Path
 import logging
+from fastapi.responses import JSONResponse
 
 from database import DATABASE_PATH
 
@@ -332,6 +333,27 @@ class AdminActionService:
         else:
             raise ValueError(f"Invalid action: {action}")
 
+# =============================================================================
+# RESPONSES
+# =============================================================================
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when it is installed.
+
+    Only for content that already holds JSON primitives (it bypasses
+    jsonable_encoder); falls back to the stdlib encoder without orjson.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
 # =============================================================================
 # GLOBAL INSTANCES
 # =============================================================================
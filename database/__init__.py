@@ -14,6 +14,7 @@ from .models import (
     MeetingRepository, MeetingParticipantRepository,
     DatabaseManager, DIContainer
 )
+from .pool import SqlitePool, init_db_pool, get_db_pool, close_db_pool
 
 # Database configuration
 DATABASE_PATH = "meeting_app.db"
@@ -33,32 +34,16 @@ async def init_database():
     logger.info(f"Database exists: {db_exists} at {DATABASE_PATH}")
     
     async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Check if required tables exist
-        required_tables = ['users', 'teams', 'team_members', 'meetings', 'meeting_participants', 'team_messages']
+        # Schema statements are idempotent (IF NOT EXISTS), so apply them on
+        # every startup: this creates missing tables and brings existing
+        # databases up to date with new indexes
+        schema_statements = sql_loader.get_schema('create_tables')
+        for statement in schema_statements:
+            if statement.strip():  # Skip empty statements
+                await db.execute(statement)
         
-        for table in required_tables:
-            cursor = await db.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name=?", 
-                (table,)
-            )
-            table_exists = await cursor.fetchone()
-            await cursor.close()
-            
-            if not table_exists:
-                logger.info(f"Table '{table}' does not exist, creating database schema...")
-                # Load schema statements from external SQL file
-                schema_statements = sql_loader.get_schema('create_tables')
-                
-                # Execute each schema statement
-                for statement in schema_statements:
-                    if statement.strip():  # Skip empty statements
-                        await db.execute(statement)
-                
-                await db.commit()
-                logger.info("Database schema created successfully")
-                break
-        else:
-            logger.info("All required tables exist")
+        await db.commit()
+        logger.info("Database schema applied successfully")
         
         # Verify users table structure
         cursor = await db.execute("PRAGMA table_info(users)")
@@ -78,5 +63,6 @@ __all__ = [
     'UserRepository', 'TeamRepository', 'TeamMemberRepository',
     'MeetingRepository', 'MeetingParticipantRepository',
     'DatabaseManager', 'DIContainer',
+    'SqlitePool', 'init_db_pool', 'get_db_pool', 'close_db_pool',
     'DATABASE_PATH', 'init_database'
 ]
\ No newline at end of file
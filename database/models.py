@@ -8,6 +8,8 @@ import aiosqlite
 import logging
 from contextlib import asynccontextmanager
 
+from . import pool as connection_pool
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -47,13 +49,16 @@ class Team:
     admin_user_id: str
     created_at: Optional[datetime] = None
     
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, current_user_id: Optional[str] = None) -> Dict[str, Any]:
+        data = {
             'team_id': self.team_id,
             'name': self.name,
             'admin_user_id': self.admin_user_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        if current_user_id is not None:
+            data['is_admin'] = self.admin_user_id == current_user_id
+        return data
 
 @dataclass
 class TeamMember:
@@ -128,6 +133,11 @@ class IUserRepository(BaseRepository):
     async def exists(self, user_id: str) -> bool:
         """Check if user exists"""
         pass
+    
+    @abstractmethod
+    async def create_if_absent(self, user: User) -> bool:
+        """Create a user unless the ID is taken; False on collision"""
+        pass
 
 class ITeamRepository(BaseRepository):
     """Team repository interface"""
@@ -206,19 +216,23 @@ class IMeetingParticipantRepository(BaseRepository):
 # =============================================================================
 
 class DatabaseManager:
-    """Database connection manager ensuring ACID properties"""
+    """Database connection manager ensuring ACID properties
+    
+    Uses the shared SqlitePool once it is open (reads on reader connections,
+    writes serialized on the writer); scripts that never open the pool fall
+    back to a connection per call.
+    """
     
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self._connection_pool: List[aiosqlite.Connection] = []
-        self._pool_size = 5
     
     @asynccontextmanager
-    async def get_connection(self):
-        """Get database connection with proper transaction management"""
+    async def _connect_once(self):
+        """Dedicated connection with its own IMMEDIATE transaction (no pool)"""
         connection = None
         try:
             connection = await aiosqlite.connect(self.db_path)
+            connection.row_factory = aiosqlite.Row
             # Enable foreign key constraints for referential integrity
             await connection.execute("PRAGMA foreign_keys = ON")
             # Enable WAL mode for better concurrency
@@ -236,14 +250,46 @@ class DatabaseManager:
             if connection:
                 await connection.close()
     
+    @asynccontextmanager
+    async def get_connection(self):
+        """Get database connection with proper transaction management"""
+        pool = connection_pool.db_pool
+        if pool is None:
+            async with self._connect_once() as connection:
+                yield connection
+            return
+        try:
+            async with pool.writer() as connection:
+                yield connection
+        except Exception as e:
+            logger.error(f"Database transaction failed: {e}")
+            raise
+    
+    @asynccontextmanager
+    async def get_read_connection(self):
+        """Get a connection for reads; never waits on the writer"""
+        pool = connection_pool.db_pool
+        if pool is None:
+            async with self._connect_once() as connection:
+                yield connection
+            return
+        async with pool.reader() as connection:
+            yield connection
+    
     async def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute a SELECT query with parameterized inputs"""
-        async with self.get_connection() as conn:
+        async with self.get_read_connection() as conn:
             async with conn.execute(query, params) as cursor:
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
                 rows = await cursor.fetchall()
                 return [dict(zip(columns, row)) for row in rows]
     
+    async def fetch_one(self, query: str, params: tuple = ()) -> Optional[aiosqlite.Row]:
+        """Fetch a single row (name-addressable) without building dicts"""
+        async with self.get_read_connection() as conn:
+            async with conn.execute(query, params) as cursor:
+                return await cursor.fetchone()
+    
     async def execute_command(self, query: str, params: tuple = ()) -> int:
         """Execute an INSERT/UPDATE/DELETE command"""
         async with self.get_connection() as conn:
@@ -254,6 +300,12 @@ class DatabaseManager:
 # CONCRETE REPOSITORY IMPLEMENTATIONS
 # =============================================================================
 
+SQL_USER_BY_ID = """
+    SELECT user_id, public_id, name, password_hash, created_at
+    FROM users
+    WHERE user_id = ?
+"""
+
 class UserRepository(IUserRepository):
     """User repository implementation with SQL injection protection"""
     
@@ -276,17 +328,29 @@ class UserRepository(IUserRepository):
             logger.error(f"Failed to create user: {e}")
             return False
     
-    async def get_by_id(self, user_id: str) -> Optional[User]:
-        """Get user by ID with parameterized query"""
+    async def create_if_absent(self, user: User) -> bool:
+        """Create a user in one statement; a taken user/public ID inserts nothing"""
         query = """
-            SELECT user_id, public_id, name, password_hash, created_at 
-            FROM users 
-            WHERE user_id = ?
+            INSERT INTO users (user_id, public_id, name, password_hash, created_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT DO NOTHING
         """
         try:
-            results = await self.db.execute_query(query, (user_id,))
-            if results:
-                row = results[0]
+            rows_affected = await self.db.execute_command(
+                query,
+                (user.user_id, user.public_id, user.name, user.password_hash)
+            )
+            return rows_affected == 1
+        except Exception as e:
+            logger.error(f"Failed to create user: {e}")
+            return False
+    
+    async def get_by_id(self, user_id: str) -> Optional[User]:
+        """Get user by ID with parameterized query"""
+        try:
+            # Constant SQL text keeps hitting the connection's statement cache
+            row = await self.db.fetch_one(SQL_USER_BY_ID, (user_id,))
+            if row:
                 return User(
                     user_id=row['user_id'],
                     public_id=row['public_id'],
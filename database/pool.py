@@ -0,0 +1,155 @@
+# database/pool.py - Shared SQLite Connection Pool
+
+import asyncio
+import logging
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Routes rely on UPDATE/DELETE ... RETURNING
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+# =============================================================================
+# CONNECTION POOL (WAL: one writer + N readers)
+# =============================================================================
+
+class SqlitePool:
+    """Long-lived aiosqlite connections opened once at startup.
+
+    SQLite allows a single writer at a time, so writes are serialized on one
+    dedicated connection while reads are spread over a queue of reader
+    connections. Keeping connections open preserves their page cache and
+    prepared-statement cache and avoids spawning a thread per request.
+    """
+
+    PRAGMAS = (
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -64000",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA busy_timeout = 5000",
+        "PRAGMA wal_autocheckpoint = 1000",
+    )
+
+    # Per-connection prepared-statement cache size (sqlite3 default is 128)
+    CACHED_STATEMENTS = 256
+
+    # Refresh planner statistics every N connection releases
+    OPTIMIZE_INTERVAL = 1000
+
+    def __init__(self, db_path: str, readers: Optional[int] = None):
+        self.db_path = db_path
+        # Default to one reader per CPU
+        self._reader_count = max(1, readers or os.cpu_count() or 4)
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._connections: List[aiosqlite.Connection] = []
+        self._releases = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Open a connection and apply the per-connection PRAGMAs"""
+        connection = await aiosqlite.connect(self.db_path, cached_statements=self.CACHED_STATEMENTS)
+        # Rows support both name and index access
+        connection.row_factory = aiosqlite.Row
+        for pragma in self.PRAGMAS:
+            await connection.execute(pragma)
+        self._connections.append(connection)
+        return connection
+
+    async def open(self):
+        """Open the writer and reader connections"""
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))}+ required, found {sqlite3.sqlite_version}"
+            )
+        self._writer = await self._connect()
+        # Analyze tables whose statistics are missing or stale (bounded scan)
+        await self._writer.execute("PRAGMA optimize = 0x10002")
+        for _ in range(self._reader_count):
+            self._readers.put_nowait(await self._connect())
+        logger.info(f"SQLite pool opened: 1 writer, {self._reader_count} readers on {self.db_path}")
+
+    async def close(self):
+        """Close every pooled connection"""
+        for connection in self._connections:
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled connection: {e}")
+        self._connections.clear()
+        self._writer = None
+        self._readers = asyncio.Queue()
+        logger.info("SQLite pool closed")
+
+    @asynccontextmanager
+    async def reader(self):
+        """Borrow a read-only connection (close cursors before leaving the block)"""
+        connection = await self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put_nowait(connection)
+            self._releases += 1
+
+    @asynccontextmanager
+    async def writer(self):
+        """Hold the single writer connection; commits on success, rolls back on error"""
+        async with self._writer_lock:
+            try:
+                # Take the write lock up front rather than upgrading a read lock mid-transaction
+                await self._writer.execute("BEGIN IMMEDIATE")
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            finally:
+                self._releases += 1
+            if self._releases >= self.OPTIMIZE_INTERVAL:
+                await self._optimize()
+
+    async def _optimize(self):
+        """Keep sqlite_stat* current so the planner keeps choosing the right indexes.
+
+        Runs on the writer (ANALYZE writes the stat tables) while its lock is held.
+        """
+        self._releases = 0
+        try:
+            await self._writer.execute("PRAGMA analysis_limit = 400")
+            await self._writer.execute("PRAGMA optimize")
+        except Exception as e:
+            logger.warning(f"PRAGMA optimize failed: {e}")
+
+# =============================================================================
+# GLOBAL POOL INSTANCE
+# =============================================================================
+
+db_pool: Optional[SqlitePool] = None
+
+async def init_db_pool(db_path: str, readers: Optional[int] = None) -> SqlitePool:
+    """Create and open the application-wide pool"""
+    global db_pool
+    db_pool = SqlitePool(db_path, readers)
+    await db_pool.open()
+    return db_pool
+
+def get_db_pool() -> SqlitePool:
+    """Get the application-wide pool"""
+    if db_pool is None:
+        raise RuntimeError("Database pool not initialized")
+    return db_pool
+
+async def close_db_pool():
+    """Close the application-wide pool"""
+    global db_pool
+    if db_pool is not None:
+        await db_pool.close()
+        db_pool = None
@@ -3,15 +3,15 @@
 import jwt
 import secrets
 import hashlib
+import hmac
 import time
-from datetime import datetime, timedelta
 from typing import Optional, Dict
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import aiosqlite
 import logging
 
-from utils import validate_user_id
+from utils import validate_user_id, TTLCache
 from config_manager import get_config
 from error_handler import AuthenticationError, create_error_response
 
@@ -22,6 +22,9 @@ config = get_config()
 # JWT CONFIGURATION
 # =============================================================================
 
+# ASGI scope key holding the request's device fingerprint once computed
+DEVICE_FINGERPRINT_SCOPE_KEY = "meetup.device_fingerprint"
+
 class JWTManager:
     def __init__(self, secret_key: str):
         self.secret_key = secret_key
@@ -35,9 +38,6 @@ class JWTManager:
         
     def create_access_token(self, user_data: dict, request: Request) -> str:
         """Create JWT access token with enhanced security"""
-        now = datetime.utcnow()
-        expire = now + timedelta(minutes=self.access_token_expire_minutes)
-        
         # Add small buffer for clock skew
         current_timestamp = time.time()
         issued_at = int(current_timestamp)
@@ -47,7 +47,7 @@ class JWTManager:
         jti = secrets.token_hex(16)
         
         # Create device fingerprint
-        fingerprint = self._create_device_fingerprint(request)
+        fingerprint = self.create_device_fingerprint(request)
         self.token_fingerprints[jti] = fingerprint
         
         payload = {
@@ -72,23 +72,24 @@ class JWTManager:
     
     def create_refresh_token(self, user_id: str) -> str:
         """Create JWT refresh token"""
-        now = datetime.utcnow()
-        expire = now + timedelta(days=self.refresh_token_expire_days)
+        issued_at = int(time.time())
+        expires_at = issued_at + self.refresh_token_expire_days * 86400
         
         jti = secrets.token_hex(16)
         
         payload = {
             "sub": user_id,
-            "iat": int(now.timestamp()),
-            "exp": int(expire.timestamp()),
+            "iat": issued_at,
+            "exp": expires_at,
             "jti": jti,
             "type": "refresh"
         }
         
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
     
-    def verify_token(self, token: str, request: Request, token_type: str = "access") -> Optional[dict]:
-        """Verify JWT token with enhanced security checks"""
+    def verify_token(self, token: str, request: Request, token_type: str = "access",
+                     fingerprint: Optional[str] = None) -> Optional[dict]:
+        """Verify JWT token with enhanced security checks (fingerprint: the request's, if already known)"""
         try:
             # Decode token
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
@@ -107,9 +108,9 @@ class JWTManager:
             # Verify device fingerprint for access tokens (if enabled)
             if token_type == "access" and config.get('security.device_fingerprinting.enabled', True):
                 stored_fingerprint = self.token_fingerprints.get(jti)
-                current_fingerprint = self._create_device_fingerprint(request)
+                current_fingerprint = fingerprint or self.create_device_fingerprint(request)
                 
-                if stored_fingerprint and stored_fingerprint != current_fingerprint:
+                if stored_fingerprint and not hmac.compare_digest(stored_fingerprint, current_fingerprint):
                     logger.warning(f"Device fingerprint mismatch for token {jti}")
                     if config.get('security.device_fingerprinting.strict_validation', True):
                         self.blacklist_token(jti)
@@ -141,9 +142,15 @@ class JWTManager:
             del self.token_fingerprints[jti]
         logger.info(f"Token blacklisted: {jti}")
     
-    def _create_device_fingerprint(self, request: Request) -> str:
-        """Create device fingerprint from request headers"""
-        headers = dict(request.headers)
+    def create_device_fingerprint(self, request: Request) -> str:
+        """Create device fingerprint from request headers (computed once per HTTP request)"""
+        # Memoized in the ASGI scope, which every dependency of a request shares
+        scope = getattr(request, "scope", None)
+        if scope is not None and DEVICE_FINGERPRINT_SCOPE_KEY in scope:
+            return scope[DEVICE_FINGERPRINT_SCOPE_KEY]
+        
+        # Header lookups go straight to the request headers, without copying them
+        headers = request.headers
         
         # Collect stable device characteristics
         fingerprint_data = [
@@ -155,7 +162,10 @@ class JWTManager:
         
         # Create hash of fingerprint data
         fingerprint_str = '|'.join(fingerprint_data)
-        return hashlib.sha256(fingerprint_str.encode()).hexdigest()
+        fingerprint = hashlib.sha256(fingerprint_str.encode()).hexdigest()
+        if scope is not None:
+            scope[DEVICE_FINGERPRINT_SCOPE_KEY] = fingerprint
+        return fingerprint
     
     def cleanup_expired_tokens(self):
         """Clean up expired token fingerprints"""
@@ -225,6 +235,20 @@ def get_jwt_manager() -> JWTManager:
 # Enhanced security bearer
 enhanced_security = None
 
+# Resolved users for recently validated access tokens: key -> (exp, jti, user dict).
+# Hits still honour the token's exp and the blacklist, and account deletion evicts
+# the user's entries, so the TTL only bounds memory held for idle tokens.
+validated_token_cache = TTLCache(maxsize=10000, ttl=300)
+
+def _token_cache_key(token: str, fingerprint: str) -> bytes:
+    """Key on the token plus the device fingerprint so a cached result is
+    only reused from the device the token is bound to"""
+    return hashlib.blake2b(f"{token}|{fingerprint}".encode(), digest_size=16).digest()
+
+def invalidate_user_tokens(user_id: str):
+    """Drop cached validations of a user's tokens (e.g. on account deletion)"""
+    validated_token_cache.pop_where(lambda _, entry: entry[2]["user_id"] == user_id)
+
 def init_enhanced_security():
     """Initialize enhanced security"""
     global enhanced_security
@@ -247,8 +271,18 @@ async def get_current_user(
         auth_credentials = await enhanced_security(request)
         token = auth_credentials.credentials
         
+        # Recently validated tokens skip the JWT decode and the user lookup
+        fingerprint = jwt_manager.create_device_fingerprint(request)
+        cache_key = _token_cache_key(token, fingerprint)
+        cached = validated_token_cache.get(cache_key)
+        if cached is not None:
+            exp, jti, user_data = cached
+            if exp > time.time() and jti not in jwt_manager.blacklisted_tokens:
+                return dict(user_data)
+            validated_token_cache.pop(cache_key)
+        
         # Verify token
-        payload = jwt_manager.verify_token(token, request, "access")
+        payload = jwt_manager.verify_token(token, request, "access", fingerprint)
         if not payload:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -256,8 +290,8 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Get user ID from payload
-        user_id = payload.get("sub")
+        # Read the claims used below once
+        user_id, jti, exp = payload.get("sub"), payload.get("jti"), payload.get("exp")
         if not user_id or not validate_user_id(user_id):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -273,7 +307,6 @@ async def get_current_user(
         user = await user_repo.get_by_id(user_id)
         if not user:
             # User was deleted, blacklist token
-            jti = payload.get("jti")
             if jti:
                 jwt_manager.blacklist_token(jti)
             
@@ -282,7 +315,10 @@ async def get_current_user(
                 detail="User not found"
             )
         
-        return user.to_safe_dict()
+        user_data = user.to_safe_dict()
+        # Only successful validations are cached
+        validated_token_cache.set(cache_key, (exp or 0, jti, user_data))
+        return dict(user_data)
                 
     except HTTPException:
         raise
@@ -361,7 +397,17 @@ async def check_team_admin(
 async def logout_user(token: str, request: Request):
     """Logout user by blacklisting token"""
     try:
-        payload = jwt_manager.verify_token(token, request, "access")
+        # get_current_user has normally just cached this token's jti
+        fingerprint = jwt_manager.create_device_fingerprint(request)
+        cached = validated_token_cache.pop(_token_cache_key(token, fingerprint))
+        if cached is not None:
+            exp, jti, user_data = cached
+            if jti and exp > time.time() and jti not in jwt_manager.blacklisted_tokens:
+                jwt_manager.blacklist_token(jti)
+                logger.info(f"User logged out: {user_data['user_id']}")
+                return
+        
+        payload = jwt_manager.verify_token(token, request, "access", fingerprint)
         if payload:
             jti = payload.get("jti")
             if jti:
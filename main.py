@@ -4,20 +4,23 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 import asyncio
 import os
 import secrets
 import logging
+import logging.handlers
+import queue
 
 # Import route modules
 from routes import user_routes, team_routes, meeting_routes, file_routes
 from websocket_handlers import websocket_router
-from database import init_database, DIContainer
+from database import init_database, init_db_pool, close_db_pool, DIContainer
 from security_middleware import SecurityMiddleware, get_csrf_token
 from enhanced_auth import init_jwt_manager, init_enhanced_security
 from services import init_services
 from config_manager import get_config
+from sql_loader import sql_loader
 
 # Initialize configuration
 config = get_config()
@@ -28,8 +31,32 @@ logging.basicConfig(
     level=log_level,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+
 logger = logging.getLogger(__name__)
 
+# =============================================================================
+# QUEUED LOGGING
+# =============================================================================
+
+@contextmanager
+def queued_logging():
+    """Route root log records through a queue for the app's lifetime.
+
+    The event loop only enqueues records; a listener thread does the I/O.
+    On exit the original root handlers are restored and the queue is drained.
+    """
+    root_logger = logging.getLogger()
+    original_handlers = root_logger.handlers[:]
+    log_queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(log_queue, *original_handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log_listener.start()
+    try:
+        yield
+    finally:
+        root_logger.handlers = original_handlers
+        log_listener.stop()
+
 # =============================================================================
 # LIFESPAN EVENTS (Modern FastAPI pattern)
 # =============================================================================
@@ -37,34 +64,40 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application lifespan events"""
-    # Startup
-    await init_database()
-    
-    # Create necessary directories
-    directories = ["static/css", "static/js", "static/html", "uploads", "logs"]
-    for directory in directories:
-        os.makedirs(directory, exist_ok=True)
-    
-    # Initialize enhanced authentication with config
-    security_key = config.get_secret_key()
-    init_jwt_manager(security_key)
-    init_enhanced_security()
-    
-    # Initialize services with dependency injection
-    di_container = DIContainer(config.get_database_path())
-    user_repository = di_container.get_user_repository()
-    init_services(user_repository)
-    
-    # Start background tasks
-    from websocket_handlers import start_background_tasks
-    asyncio.create_task(start_background_tasks())
-    
-    logger.info("Meeting App started successfully with enhanced security")
-    
-    yield  # Application runs here
-    
-    # Shutdown (if needed)
-    logger.info("Meeting App shutting down")
+    with queued_logging():
+        # Startup
+        # Parse all SQL files once so lookups never hit the filesystem mid-request
+        sql_loader.preload_all()
+        await init_database()
+        await init_db_pool(config.get_database_path(), config.get('database.pool_readers'))
+        
+        # Create necessary directories
+        directories = ["static/css", "static/js", "static/html", "uploads", "logs"]
+        for directory in directories:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Initialize enhanced authentication with config
+        security_key = config.get_secret_key()
+        init_jwt_manager(security_key)
+        init_enhanced_security()
+        
+        # Initialize services with dependency injection
+        di_container = DIContainer(config.get_database_path())
+        user_repository = di_container.get_user_repository()
+        await init_services(user_repository)
+        
+        # Start background tasks
+        from websocket_handlers import start_background_tasks
+        asyncio.create_task(start_background_tasks())
+        
+        logger.info("Meeting App started successfully with enhanced security")
+        
+        try:
+            yield  # Application runs here
+        finally:
+            # Shutdown
+            await close_db_pool()
+            logger.info("Meeting App shutting down")
 
 # =============================================================================
 # APP CONFIGURATION
@@ -1,10 +1,16 @@
 # models.py - Clean Pydantic Models without Email
 
 from pydantic import BaseModel, validator, Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 import re
+import time
+
+# Compiled once at import; validators run on every request body
+NAME_PATTERN = re.compile(r'^[a-zA-Z0-9\s\-_.]+$')
+# Anchored so match/search cannot accept longer strings; \Z (unlike $) rejects a trailing newline
+HEX_ID_PATTERN = re.compile(r'\A[0-9a-f]{32}\Z', re.IGNORECASE)
 
 # =============================================================================
 # ENUMS
@@ -49,7 +55,7 @@ class UserRegister(BaseModel):
     @validator('name')
     def validate_name(cls, v):
         v = v.strip()
-        if not re.match(r'^[a-zA-Z0-9\s\-_.]+$', v):
+        if not NAME_PATTERN.match(v):
             raise ValueError('Name contains invalid characters')
         return v
     
@@ -66,9 +72,7 @@ class UserLogin(BaseModel):
     
     @validator('user_id')
     def validate_user_id(cls, v):
-        try:
-            int(v, 16)
-        except ValueError:
+        if not HEX_ID_PATTERN.fullmatch(v):
             raise ValueError('Invalid user ID format')
         return v.lower()
 
@@ -110,7 +114,7 @@ class TeamCreate(BaseModel):
     @validator('name')
     def validate_name(cls, v):
         v = v.strip()
-        if not re.match(r'^[a-zA-Z0-9\s\-_.]+$', v):
+        if not NAME_PATTERN.match(v):
             raise ValueError('Team name contains invalid characters')
         return v
 
@@ -121,9 +125,7 @@ class TeamJoinRequest(BaseModel):
     
     @validator('team_id')
     def validate_team_id(cls, v):
-        try:
-            int(v, 16)
-        except ValueError:
+        if not HEX_ID_PATTERN.fullmatch(v):
             raise ValueError('Invalid team ID format')
         return v.lower()
 
@@ -151,7 +153,7 @@ class MeetingCreate(BaseModel):
     @validator('name')
     def validate_name(cls, v):
         v = v.strip()
-        if not re.match(r'^[a-zA-Z0-9\s\-_.]+$', v):
+        if not NAME_PATTERN.match(v):
             raise ValueError('Meeting name contains invalid characters')
         return v
 
@@ -162,9 +164,7 @@ class MeetingJoinRequest(BaseModel):
     
     @validator('meeting_id')
     def validate_meeting_id(cls, v):
-        try:
-            int(v, 16)
-        except ValueError:
+        if not HEX_ID_PATTERN.fullmatch(v):
             raise ValueError('Invalid meeting ID format')
         return v.lower()
 
@@ -220,9 +220,17 @@ class AdminAction(BaseModel):
     
     @validator('target_user_id')
     def validate_target_user_id(cls, v):
-        try:
-            int(v, 16)
-        except ValueError:
+        if not HEX_ID_PATTERN.fullmatch(v):
+            raise ValueError('Invalid user ID format')
+        return v.lower()
+
+class BulkApprove(BaseModel):
+    """Approve several pending join requests at once"""
+    user_ids: List[Annotated[str, Field(min_length=32, max_length=32)]] = Field(..., min_length=1, max_length=100)
+    
+    @validator('user_ids', each_item=True)
+    def validate_user_ids(cls, v):
+        if not HEX_ID_PATTERN.fullmatch(v):
             raise ValueError('Invalid user ID format')
         return v.lower()
 
@@ -234,7 +242,7 @@ class WebSocketMessage(BaseModel):
     """WebSocket message model"""
     type: str = Field(..., min_length=1, max_length=50)
     payload: Dict[str, Any] = Field(default_factory=dict)
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: int = Field(default_factory=time.time_ns)  # epoch nanoseconds
     user_id: Optional[str] = None
     room_id: Optional[str] = None
 
@@ -246,9 +254,7 @@ class WebRTCSignal(BaseModel):
     
     @validator('target_user_id')
     def validate_target_user_id(cls, v):
-        try:
-            int(v, 16)
-        except ValueError:
+        if not HEX_ID_PATTERN.fullmatch(v):
             raise ValueError('Invalid user ID format')
         return v.lower()
 
@@ -5,18 +5,17 @@ Handles file uploading, serving, and management for team chat file sharing.
 Includes secure token-based access to prevent unauthorized downloads.
 """
 
-import os
 import aiofiles
+import aiofiles.os
 import uuid
 from pathlib import Path
 from typing import Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Response, Query
 from fastapi.responses import FileResponse
-import aiosqlite
 import logging
 
 from enhanced_auth import get_current_user
-from database import DIContainer
+from database import DIContainer, get_db_pool
 from config_manager import get_config
 
 config = get_config()
@@ -32,6 +31,34 @@ router = APIRouter()
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# SQL statements are module constants so every request passes the same
+# string and hits the pooled connection's prepared-statement cache
+SQL_MEMBER_STATUS = "SELECT status FROM team_members WHERE team_id = ? AND user_id = ?"
+
+SQL_INSERT_FILE_MESSAGE = """INSERT INTO team_messages
+   (team_id, user_id, message, message_type, file_path)
+   VALUES (?, ?, ?, ?, ?)"""
+
+SQL_FILE_ACCESS = """SELECT tm.team_id, tm.message, tmbr.status
+   FROM team_messages tm
+   JOIN team_members tmbr ON tm.team_id = tmbr.team_id
+   WHERE tm.file_path = ? AND tmbr.user_id = ?"""
+
+SQL_FILE_INFO = """SELECT tm.team_id, tm.message, tm.created_at, u.name, tmbr.status
+   FROM team_messages tm
+   JOIN users u ON tm.user_id = u.user_id
+   JOIN team_members tmbr ON tm.team_id = tmbr.team_id
+   WHERE tm.file_path = ? AND tmbr.user_id = ? AND tmbr.status = 'approved'"""
+
+# Only the uploader or the team admin may delete; the permission check and
+# the delete run as one statement
+SQL_DELETE_FILE_MESSAGE = """DELETE FROM team_messages
+   WHERE file_path = ?
+     AND (user_id = ? OR team_id IN (SELECT team_id FROM teams WHERE admin_user_id = ?))
+   RETURNING team_id"""
+
+SQL_FILE_EXISTS = "SELECT 1 FROM team_messages WHERE file_path = ?"
+
 @router.post("/teams/{team_id}/upload")
 async def upload_file(
     team_id: str,
@@ -47,9 +74,9 @@ async def upload_file(
         raise HTTPException(status_code=400, detail=str(e))
     
     # Check if user is a team member
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().reader() as db:
         async with db.execute(
-            "SELECT status FROM team_members WHERE team_id = ? AND user_id = ?",
+            SQL_MEMBER_STATUS,
             (team_id, current_user["user_id"])
         ) as cursor:
             membership = await cursor.fetchone()
@@ -74,15 +101,12 @@ async def upload_file(
             await f.write(content)
         
         # Store file info in database
-        async with aiosqlite.connect(config.get_database_path()) as db:
+        async with get_db_pool().writer() as db:
             await db.execute(
-                """INSERT INTO team_messages 
-                   (team_id, user_id, message, message_type, file_path) 
-                   VALUES (?, ?, ?, ?, ?)""",
+                SQL_INSERT_FILE_MESSAGE,
                 (team_id, current_user["user_id"], 
                  f"[FILE] {file.filename}", "file", str(file_path))
             )
-            await db.commit()
         
         return {
             "message": "File uploaded successfully",
@@ -94,8 +118,10 @@ async def upload_file(
         
     except Exception as e:
         # Cleanup file if database operation fails
-        if file_path.exists():
-            file_path.unlink()
+        try:
+            await aiofiles.os.remove(file_path)
+        except FileNotFoundError:
+            pass
         raise HTTPException(status_code=500, detail="File upload failed")
 
 @router.get("/files/{file_id}/token")
@@ -112,16 +138,13 @@ async def get_file_token(file_id: str, access_type: str = "download", current_us
     
     file_path = UPLOAD_DIR / file_id
     
-    if not file_path.exists():
+    if not await aiofiles.os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
     
     # Get file info from database to check permissions
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().reader() as db:
         async with db.execute(
-            """SELECT tm.team_id, tm.message, tmbr.status 
-               FROM team_messages tm
-               JOIN team_members tmbr ON tm.team_id = tmbr.team_id
-               WHERE tm.file_path = ? AND tmbr.user_id = ?""",
+            SQL_FILE_ACCESS,
             (str(file_path), current_user["user_id"])
         ) as cursor:
             result = await cursor.fetchone()
@@ -165,16 +188,13 @@ async def download_file(file_id: str, token: str = Query(...), current_user: dic
     
     file_path = UPLOAD_DIR / file_id
     
-    if not file_path.exists():
+    if not await aiofiles.os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
     
     # Get file info from database
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().reader() as db:
         async with db.execute(
-            """SELECT tm.team_id, tm.message, tmbr.status 
-               FROM team_messages tm
-               JOIN team_members tmbr ON tm.team_id = tmbr.team_id
-               WHERE tm.file_path = ? AND tmbr.user_id = ?""",
+            SQL_FILE_ACCESS,
             (str(file_path), current_user["user_id"])
         ) as cursor:
             result = await cursor.fetchone()
@@ -198,17 +218,15 @@ async def get_file_info(file_id: str, current_user: dict = Depends(get_current_u
     
     file_path = UPLOAD_DIR / file_id
     
-    if not file_path.exists():
+    try:
+        file_size = (await aiofiles.os.stat(file_path)).st_size
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Get file info from database
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().reader() as db:
         async with db.execute(
-            """SELECT tm.team_id, tm.message, tm.created_at, u.name, tmbr.status
-               FROM team_messages tm
-               JOIN users u ON tm.user_id = u.user_id
-               JOIN team_members tmbr ON tm.team_id = tmbr.team_id
-               WHERE tm.file_path = ? AND tmbr.user_id = ? AND tmbr.status = 'approved'""",
+            SQL_FILE_INFO,
             (str(file_path), current_user["user_id"])
         ) as cursor:
             result = await cursor.fetchone()
@@ -216,7 +234,6 @@ async def get_file_info(file_id: str, current_user: dict = Depends(get_current_u
                 raise HTTPException(status_code=403, detail="Access denied")
     
     original_filename = result[1].replace("[FILE] ", "")
-    file_size = file_path.stat().st_size
     
     # Determine if file is an image
     image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
@@ -249,16 +266,13 @@ async def preview_file(file_id: str, token: str = Query(...), current_user: dict
     
     file_path = UPLOAD_DIR / file_id
     
-    if not file_path.exists():
+    if not await aiofiles.os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
     
     # Check permissions
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().reader() as db:
         async with db.execute(
-            """SELECT tm.team_id, tm.message, tmbr.status 
-               FROM team_messages tm
-               JOIN team_members tmbr ON tm.team_id = tmbr.team_id
-               WHERE tm.file_path = ? AND tmbr.user_id = ?""",
+            SQL_FILE_ACCESS,
             (str(file_path), current_user["user_id"])
         ) as cursor:
             result = await cursor.fetchone()
@@ -293,34 +307,25 @@ async def delete_file(file_id: str, current_user: dict = Depends(get_current_use
     
     file_path = UPLOAD_DIR / file_id
     
-    # Get file info and check permissions
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    # Delete from database if user is the uploader or team admin
+    async with get_db_pool().writer() as db:
         async with db.execute(
-            """SELECT tm.team_id, tm.user_id, t.admin_user_id
-               FROM team_messages tm
-               JOIN teams t ON tm.team_id = t.team_id
-               WHERE tm.file_path = ?""",
-            (str(file_path),)
+            SQL_DELETE_FILE_MESSAGE,
+            (str(file_path), current_user["user_id"], current_user["user_id"])
         ) as cursor:
-            result = await cursor.fetchone()
-            if not result:
-                raise HTTPException(status_code=404, detail="File not found")
+            deleted = await cursor.fetchone()
         
-        team_id, uploader_id, admin_id = result
-        
-        # Check if user can delete (uploader or team admin)
-        if current_user["user_id"] not in [uploader_id, admin_id]:
+        if not deleted:
+            # Nothing deleted - work out whether the file is missing or forbidden
+            async with db.execute(SQL_FILE_EXISTS, (str(file_path),)) as cursor:
+                if not await cursor.fetchone():
+                    raise HTTPException(status_code=404, detail="File not found")
             raise HTTPException(status_code=403, detail="Cannot delete this file")
-        
-        # Delete from database
-        await db.execute(
-            "DELETE FROM team_messages WHERE file_path = ?",
-            (str(file_path),)
-        )
-        await db.commit()
     
     # Delete physical file
-    if file_path.exists():
-        file_path.unlink()
+    try:
+        await aiofiles.os.remove(file_path)
+    except FileNotFoundError:
+        pass
     
     return {"message": "File deleted successfully"}
\ No newline at end of file
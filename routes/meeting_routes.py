@@ -1,13 +1,15 @@
 # routes/meeting_routes.py - Meeting Management Routes - FIXED VERSION
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+import asyncio
 import aiosqlite
 import logging
-import asyncio
+from typing import Optional
 
-from database import DIContainer
-from models import MeetingCreate, MeetingJoinRequest, AdminAction
-from utils import generate_id
+from database import DIContainer, get_db_pool
+from models import MeetingCreate, MeetingJoinRequest, AdminAction, BulkApprove
+from utils import generate_id, TTLCache, fire_and_forget
+from common_utils import FastJSONResponse
 from enhanced_auth import get_current_user, check_meeting_creator
 from config_manager import get_config
 
@@ -19,12 +21,95 @@ router = APIRouter()
 
 # Import WebSocket functions for notifications
 try:
-    from websocket_handlers import broadcast_meeting_deleted, notify_user, broadcast_to_room
+    from websocket_handlers import broadcast_meeting_deleted, notify_user, broadcast_to_room, notify_user_and_room
 except ImportError:
     logger.warning("WebSocket handlers not available for meeting notifications")
     async def broadcast_meeting_deleted(meeting_id: str): pass
     async def notify_user(user_id: str, message_type: str, message: str, **kwargs): pass
     async def broadcast_to_room(room_id: str, message_type: str, message: str, **kwargs): pass
+    async def notify_user_and_room(user_id: str, room_id: str, user_message_type: str, user_message: str,
+                                   room_message_type: str, room_message: str): pass
+
+# =============================================================================
+# SQL STATEMENTS
+# =============================================================================
+
+# Shared statement strings keep the SQLite prepared-statement cache warm
+SQL_MEETING_CREATOR = "SELECT creator_user_id FROM meetings WHERE meeting_id = ?"
+SQL_PARTICIPANT_STATUS = "SELECT status FROM meeting_participants WHERE meeting_id = ? AND user_id = ?"
+SQL_DELETE_PARTICIPANT = "DELETE FROM meeting_participants WHERE meeting_id = ? AND user_id = ?"
+SQL_DELETE_MEETING = "DELETE FROM meetings WHERE meeting_id = ?"
+SQL_INSERT_MEETING = "INSERT INTO meetings (meeting_id, name, creator_user_id) VALUES (?, ?, ?)"
+SQL_INSERT_PARTICIPANT = "INSERT INTO meeting_participants (meeting_id, user_id, status) VALUES (?, ?, ?)"
+SQL_UPDATE_PARTICIPANT_STATUS = "UPDATE meeting_participants SET status = ? WHERE meeting_id = ? AND user_id = ?"
+
+# Pending-request decisions: the status check and the write are one statement
+SQL_DECIDE_PENDING_PARTICIPANT = """UPDATE meeting_participants SET status = ?
+   WHERE meeting_id = ? AND user_id = ? AND status = 'pending'
+   RETURNING user_id"""
+SQL_DELETE_PENDING_PARTICIPANT = """DELETE FROM meeting_participants
+   WHERE meeting_id = ? AND user_id = ? AND status = 'pending'
+   RETURNING user_id"""
+
+# Bulk approve: the IN list placeholders are filled in per request
+SQL_APPROVE_PENDING_BULK = """UPDATE meeting_participants SET status = 'approved'
+   WHERE meeting_id = ? AND status = 'pending' AND user_id IN ({placeholders})
+   RETURNING user_id"""
+
+# Pending join requests, newest first; rows are encoded straight to JSON, since
+# SQLite does not guarantee the order of json_group_array over a subquery
+SQL_PENDING_REQUESTS = """SELECT u.user_id, u.public_id, u.name, mp.joined_at AS requested_at
+   FROM meeting_participants mp
+   JOIN users u ON mp.user_id = u.user_id
+   WHERE mp.meeting_id = ? AND mp.status = 'pending'
+   ORDER BY mp.joined_at DESC"""
+
+# =============================================================================
+# MEETING CREATOR CACHE
+# =============================================================================
+
+# A meeting's creator never changes, so host checks are served from memory;
+# entries are dropped when the meeting is deleted
+meeting_creator_cache = TTLCache(maxsize=10000, ttl=300)
+
+async def get_meeting_creator(meeting_id: str) -> Optional[str]:
+    """Get the meeting creator's user ID, or None if the meeting doesn't exist"""
+    creator = meeting_creator_cache.get(meeting_id)
+    if creator is None:
+        async with get_db_pool().reader() as db:
+            async with db.execute(SQL_MEETING_CREATOR, (meeting_id,)) as cursor:
+                meeting_data = await cursor.fetchone()
+        if meeting_data:
+            creator = meeting_data["creator_user_id"]
+            meeting_creator_cache.set(meeting_id, creator)
+    return creator
+
+def invalidate_meeting_creator(meeting_id: str):
+    """Drop the cached creator of a meeting (e.g. once the meeting is deleted)"""
+    meeting_creator_cache.pop(meeting_id)
+
+async def _delete_meeting_records(meeting_id: str):
+    """Delete the meeting row (participants go with it) and drop its cache entry"""
+    async with get_db_pool().writer() as db:
+        # Participants are removed by the trg_meetings_delete_participants trigger
+        await db.execute(SQL_DELETE_MEETING, (meeting_id,))
+    invalidate_meeting_creator(meeting_id)
+
+async def _teardown_meeting(meeting_id: str, deleted_by: str):
+    """Notify participants, then delete the meeting (runs after the response is sent)"""
+    # Notify all participants before deletion (returns once every send has completed)
+    try:
+        await broadcast_meeting_deleted(meeting_id)
+    except Exception as e:
+        logger.warning(f"Could not broadcast meeting deletion: {e}")
+    
+    try:
+        await _delete_meeting_records(meeting_id)
+    except Exception as e:
+        logger.error(f"Failed to delete meeting {meeting_id}: {e}")
+        return
+    
+    logger.info(f"Meeting deleted: {meeting_id} by {deleted_by}")
 
 # =============================================================================
 # MEETING MANAGEMENT
@@ -35,20 +120,20 @@ async def create_meeting(meeting: MeetingCreate, current_user: dict = Depends(ge
     """Create a new meeting"""
     meeting_id = generate_id()
     
-    async with aiosqlite.connect(config.get_database_path()) as db:
+    async with get_db_pool().writer() as db:
         # Create meeting
         await db.execute(
-            "INSERT INTO meetings (meeting_id, name, creator_user_id) VALUES (?, ?, ?)",
+            SQL_INSERT_MEETING,
             (meeting_id, meeting.name, current_user["user_id"])
         )
         
         # Add creator as approved participant
         await db.execute(
-            "INSERT INTO meeting_participants (meeting_id, user_id, status) VALUES (?, ?, 'approved')",
-            (meeting_id, current_user["user_id"])
+            SQL_INSERT_PARTICIPANT,
+            (meeting_id, current_user["user_id"], "approved")
         )
-        
-        await db.commit()
+    
+    meeting_creator_cache.set(meeting_id, current_user["user_id"])
     
     logger.info(f"Meeting created: {meeting.name} by {current_user['name']}")
     return {"meeting_id": meeting_id, "name": meeting.name}
@@ -56,44 +141,43 @@ async def create_meeting(meeting: MeetingCreate, current_user: dict = Depends(ge
 @router.post("/meetings/join")
 async def join_meeting(request: MeetingJoinRequest, current_user: dict = Depends(get_current_user)):
     """Request to join a meeting"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if meeting exists
-        async with db.execute("SELECT meeting_id, creator_user_id FROM meetings WHERE meeting_id = ?", (request.meeting_id,)) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data:
-                raise HTTPException(status_code=404, detail="Meeting not found")
-        
-        meeting_creator_id = meeting_data[1]
-        
+    # Check if meeting exists
+    meeting_creator_id = await get_meeting_creator(request.meeting_id)
+    if not meeting_creator_id:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    async with get_db_pool().writer() as db:
         # Check if already a participant
         async with db.execute(
-            "SELECT status FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
+            SQL_PARTICIPANT_STATUS,
             (request.meeting_id, current_user["user_id"])
         ) as cursor:
             existing = await cursor.fetchone()
             if existing:
-                if existing[0] == "approved":
+                if existing["status"] == "approved":
                     return {"message": "Already in meeting", "approved": True}
-                elif existing[0] == "pending":
+                elif existing["status"] == "pending":
                     raise HTTPException(status_code=400, detail="Join request already pending")
                 else:
                     raise HTTPException(status_code=400, detail="Join request was rejected")
         
         # Add join request with pending status
-        await db.execute(
-            "INSERT INTO meeting_participants (meeting_id, user_id, status) VALUES (?, ?, 'pending')",
-            (request.meeting_id, current_user["user_id"])
-        )
-        await db.commit()
+        try:
+            await db.execute(
+                SQL_INSERT_PARTICIPANT,
+                (request.meeting_id, current_user["user_id"], "pending")
+            )
+        except aiosqlite.IntegrityError:
+            # Meeting was deleted after its creator was cached
+            invalidate_meeting_creator(request.meeting_id)
+            raise HTTPException(status_code=404, detail="Meeting not found")
     
     # Notify meeting creator about new pending request
-    try:
-        await notify_user(meeting_creator_id, "pending_request", 
-                         f"{current_user['name']} requested to join the meeting",
-                         meeting_id=request.meeting_id,
-                         requester=current_user)
-    except Exception as e:
-        logger.warning(f"Could not notify meeting creator: {e}")
+    fire_and_forget(notify_user(meeting_creator_id, "pending_request", 
+                                f"{current_user['name']} requested to join the meeting",
+                                meeting_id=request.meeting_id,
+                                requester=current_user),
+                    "notify meeting creator")
     
     logger.info(f"Meeting join request: {current_user['name']} -> {request.meeting_id}")
     return {"message": "Join request sent. Waiting for host approval.", "approved": False}
@@ -101,23 +185,18 @@ async def join_meeting(request: MeetingJoinRequest, current_user: dict = Depends
 @router.get("/meetings/{meeting_id}/status")
 async def get_meeting_status(meeting_id: str, current_user: dict = Depends(get_current_user)):
     """Get user's status in meeting"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if meeting exists
-        async with db.execute(
-            "SELECT creator_user_id FROM meetings WHERE meeting_id = ?", (meeting_id,)
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data:
-                raise HTTPException(status_code=404, detail="Meeting not found")
-        
-        is_creator = meeting_data[0] == current_user["user_id"]
-        
-        if is_creator:
-            return {"status": "approved", "is_creator": True}
-        
+    # Check if meeting exists
+    creator = await get_meeting_creator(meeting_id)
+    if not creator:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    if creator == current_user["user_id"]:
+        return {"status": "approved", "is_creator": True}
+    
+    async with get_db_pool().reader() as db:
         # Check user's participation status
         async with db.execute(
-            "SELECT status FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
+            SQL_PARTICIPANT_STATUS,
             (meeting_id, current_user["user_id"])
         ) as cursor:
             participant_data = await cursor.fetchone()
@@ -125,7 +204,7 @@ async def get_meeting_status(meeting_id: str, current_user: dict = Depends(get_c
             if not participant_data:
                 return {"status": "not_member", "is_creator": False}
             
-            return {"status": participant_data[0], "is_creator": False}
+            return {"status": participant_data["status"], "is_creator": False}
 
 # =============================================================================
 # MEETING ADMINISTRATION
@@ -134,234 +213,183 @@ async def get_meeting_status(meeting_id: str, current_user: dict = Depends(get_c
 @router.get("/meetings/{meeting_id}/pending")
 async def get_meeting_pending_requests(meeting_id: str, current_user: dict = Depends(get_current_user)):
     """Get pending join requests for a meeting (host only)"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if user is meeting creator
-        async with db.execute(
-            "SELECT creator_user_id FROM meetings WHERE meeting_id = ?", (meeting_id,)
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data or meeting_data[0] != current_user["user_id"]:
-                raise HTTPException(status_code=403, detail="Only meeting host can view pending requests")
-        
-        # Get pending requests
-        async with db.execute("""
-            SELECT u.user_id, u.public_id, u.name, mp.joined_at
-            FROM meeting_participants mp
-            JOIN users u ON mp.user_id = u.user_id
-            WHERE mp.meeting_id = ? AND mp.status = 'pending'
-            ORDER BY mp.joined_at DESC
-        """, (meeting_id,)) as cursor:
-            requests = await cursor.fetchall()
-            return [
-                {
-                    "user_id": req[0],
-                    "public_id": req[1],
-                    "name": req[2], 
-                    "requested_at": req[3]
-                } for req in requests
-            ]
+    # Check if user is meeting creator
+    if await get_meeting_creator(meeting_id) != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only meeting host can view pending requests")
+    
+    async with get_db_pool().reader() as db:
+        async with db.execute(SQL_PENDING_REQUESTS, (meeting_id,)) as cursor:
+            rows = await cursor.fetchall()
+    
+    # Rows hold only JSON primitives, so skip jsonable_encoder
+    return FastJSONResponse([dict(row) for row in rows])
 
 @router.post("/meetings/{meeting_id}/approve")
 async def approve_meeting_request(meeting_id: str, action: AdminAction, current_user: dict = Depends(get_current_user)):
     """Approve or reject meeting join request (host only)"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if user is meeting creator
-        async with db.execute(
-            "SELECT creator_user_id FROM meetings WHERE meeting_id = ?", (meeting_id,)
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data or meeting_data[0] != current_user["user_id"]:
-                raise HTTPException(status_code=403, detail="Only meeting host can approve requests")
-        
-        # Check if request exists
-        async with db.execute(
-            "SELECT status FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
-            (meeting_id, action.target_user_id)
-        ) as cursor:
-            existing = await cursor.fetchone()
-            if not existing:
-                raise HTTPException(status_code=404, detail="Join request not found")
-            if existing[0] != "pending":
-                raise HTTPException(status_code=400, detail="Request is not pending")
-        
-        # Update status based on action
-        if action.action == "approve":
-            new_status = "approved"
-            message = "User approved to join meeting"
-            notification_message = "Your request to join the meeting has been approved"
-        elif action.action == "reject":
-            new_status = "rejected"
-            message = "User request rejected"
-            notification_message = "Your request to join the meeting has been rejected"
-        elif action.action == "remove":
+    if action.action == "approve":
+        new_status = "approved"
+        message = "User approved to join meeting"
+        notification_message = "Your request to join the meeting has been approved"
+    elif action.action == "reject":
+        new_status = "rejected"
+        message = "User request rejected"
+        notification_message = "Your request to join the meeting has been rejected"
+    elif action.action != "remove":
+        raise HTTPException(status_code=400, detail="Invalid action")
+    
+    # Check if user is meeting creator
+    if await get_meeting_creator(meeting_id) != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only meeting host can approve requests")
+    
+    async with get_db_pool().writer() as db:
+        # Mutate only a pending request; RETURNING tells us whether one matched
+        if action.action == "remove":
             # Remove from meeting entirely
-            await db.execute(
-                "DELETE FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
-                (meeting_id, action.target_user_id)
-            )
-            await db.commit()
-            
-            # Notify user they were removed
-            try:
-                await notify_user(action.target_user_id, "meeting_removed", 
-                                "You have been removed from the meeting")
-            except Exception as e:
-                logger.warning(f"Could not notify removed user: {e}")
-            
-            logger.info(f"User removed from meeting: {action.target_user_id} from {meeting_id}")
-            return {"message": "User removed from meeting"}
+            sql, params = SQL_DELETE_PENDING_PARTICIPANT, (meeting_id, action.target_user_id)
         else:
-            raise HTTPException(status_code=400, detail="Invalid action")
+            sql, params = SQL_DECIDE_PENDING_PARTICIPANT, (new_status, meeting_id, action.target_user_id)
         
-        await db.execute(
-            "UPDATE meeting_participants SET status = ? WHERE meeting_id = ? AND user_id = ?",
-            (new_status, meeting_id, action.target_user_id)
-        )
-        await db.commit()
+        async with db.execute(sql, params) as cursor:
+            changed = await cursor.fetchone()
         
-        # Notify user about decision
-        try:
-            await notify_user(action.target_user_id, "request_decision", notification_message,
-                            meeting_id=meeting_id, decision=action.action)
-        except Exception as e:
-            logger.warning(f"Could not notify user about decision: {e}")
+        if not changed:
+            # Error path only: tell a missing request from one already decided
+            async with db.execute(
+                SQL_PARTICIPANT_STATUS,
+                (meeting_id, action.target_user_id)
+            ) as cursor:
+                existing = await cursor.fetchone()
+            if not existing:
+                raise HTTPException(status_code=404, detail="Join request not found")
+            raise HTTPException(status_code=400, detail="Request is not pending")
+    
+    if action.action == "remove":
+        # Notify user they were removed
+        fire_and_forget(notify_user(action.target_user_id, "meeting_removed", 
+                                    "You have been removed from the meeting"),
+                        "notify removed user")
         
-        logger.info(f"Meeting request {action.action}: {action.target_user_id} in {meeting_id}")
-        return {"message": message}
+        logger.info(f"User removed from meeting: {action.target_user_id} from {meeting_id}")
+        return {"message": "User removed from meeting"}
+    
+    # Notify user about decision
+    fire_and_forget(notify_user(action.target_user_id, "request_decision", notification_message,
+                                meeting_id=meeting_id, decision=action.action),
+                    "notify user about decision")
+    
+    logger.info(f"Meeting request {action.action}: {action.target_user_id} in {meeting_id}")
+    return {"message": message}
+
+@router.post("/meetings/{meeting_id}/approve_bulk")
+async def approve_meeting_requests_bulk(meeting_id: str, body: BulkApprove, current_user: dict = Depends(get_current_user)):
+    """Approve several pending join requests in one statement (host only)"""
+    if await get_meeting_creator(meeting_id) != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only meeting host can approve requests")
+    
+    user_ids = list(dict.fromkeys(body.user_ids))
+    sql = SQL_APPROVE_PENDING_BULK.format(placeholders=",".join("?" * len(user_ids)))
+    
+    async with get_db_pool().writer() as db:
+        async with db.execute(sql, (meeting_id, *user_ids)) as cursor:
+            approved = [row["user_id"] for row in await cursor.fetchall()]
+    
+    # Only users whose request was actually pending get notified
+    if approved:
+        fire_and_forget(asyncio.gather(*(
+            notify_user(user_id, "request_decision",
+                        "Your request to join the meeting has been approved",
+                        meeting_id=meeting_id, decision="approve")
+            for user_id in approved
+        )), "notify approved users")
+    
+    logger.info(f"Meeting requests bulk approved: {len(approved)} of {len(user_ids)} in {meeting_id}")
+    return {"message": f"{len(approved)} user(s) approved", "approved": approved}
 
 @router.post("/meetings/{meeting_id}/kick")
 async def kick_participant(meeting_id: str, action: AdminAction, current_user: dict = Depends(get_current_user)):
     """Kick or block participant from meeting (host only)"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if user is meeting creator
-        async with db.execute(
-            "SELECT creator_user_id FROM meetings WHERE meeting_id = ?", (meeting_id,)
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data or meeting_data[0] != current_user["user_id"]:
-                raise HTTPException(status_code=403, detail="Only meeting host can kick participants")
-        
-        # Check if user is actually in the meeting
-        async with db.execute(
-            "SELECT status FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
-            (meeting_id, action.target_user_id)
-        ) as cursor:
-            participant_data = await cursor.fetchone()
-            if not participant_data:
-                raise HTTPException(status_code=404, detail="User is not in this meeting")
-        
+    if action.action == "kick":
+        message = "User kicked from meeting"
+        notification_message = "You have been kicked from the meeting"
+    elif action.action == "block":
+        message = "User blocked from meeting"
+        notification_message = "You have been blocked from the meeting"
+    else:
+        raise HTTPException(status_code=400, detail="Invalid action. Use 'kick' or 'block'")
+    
+    # Check if user is meeting creator
+    if await get_meeting_creator(meeting_id) != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only meeting host can kick participants")
+    
+    async with get_db_pool().writer() as db:
         if action.action == "kick":
             # Remove from meeting
-            await db.execute(
-                "DELETE FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
+            cursor = await db.execute(
+                SQL_DELETE_PARTICIPANT,
                 (meeting_id, action.target_user_id)
             )
-            message = "User kicked from meeting"
-            notification_message = "You have been kicked from the meeting"
-        elif action.action == "block":
+        else:
             # Block from meeting (set status to blocked)
-            await db.execute(
-                "UPDATE meeting_participants SET status = 'blocked' WHERE meeting_id = ? AND user_id = ?",
-                (meeting_id, action.target_user_id)
+            cursor = await db.execute(
+                SQL_UPDATE_PARTICIPANT_STATUS,
+                ("blocked", meeting_id, action.target_user_id)
             )
-            message = "User blocked from meeting"
-            notification_message = "You have been blocked from the meeting"
-        else:
-            raise HTTPException(status_code=400, detail="Invalid action. Use 'kick' or 'block'")
-        
-        await db.commit()
-        
-        # Notify user they were kicked/blocked
-        try:
-            await notify_user(action.target_user_id, "meeting_kicked", notification_message)
-        except Exception as e:
-            logger.warning(f"Could not notify kicked user: {e}")
-        
-        # Broadcast to meeting room
-        try:
-            await broadcast_to_room(meeting_id, "participant_removed", 
-                                  f"A participant was {action.action}ed from the meeting")
-        except Exception as e:
-            logger.warning(f"Could not broadcast kick event: {e}")
-        
-        logger.info(f"User {action.action}ed from meeting: {action.target_user_id} from {meeting_id}")
-        return {"message": message}
+        # No row touched means the user was never in the meeting
+        affected = cursor.rowcount
+        await cursor.close()
+        if affected == 0:
+            raise HTTPException(status_code=404, detail="User is not in this meeting")
+    
+    # Notify user they were kicked/blocked and tell the meeting room
+    fire_and_forget(notify_user_and_room(action.target_user_id, meeting_id,
+                                         "meeting_kicked", notification_message,
+                                         "participant_removed",
+                                         f"A participant was {action.action}ed from the meeting"),
+                    "notify kick event")
+    
+    logger.info(f"User {action.action}ed from meeting: {action.target_user_id} from {meeting_id}")
+    return {"message": message}
 
 @router.post("/meetings/{meeting_id}/leave")
 async def leave_meeting(meeting_id: str, current_user: dict = Depends(get_current_user)):
     """Leave meeting - if creator, end meeting for everyone"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if user is meeting creator
-        async with db.execute(
-            "SELECT creator_user_id FROM meetings WHERE meeting_id = ?", (meeting_id,)
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data:
-                raise HTTPException(status_code=404, detail="Meeting not found")
-        
-        is_creator = meeting_data[0] == current_user["user_id"]
+    # Check if user is meeting creator
+    creator = await get_meeting_creator(meeting_id)
+    if not creator:
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    is_creator = creator == current_user["user_id"]
+    
+    if is_creator:
+        # Creator is leaving - end meeting for everyone
+        # Participants are notified before the meeting is deleted
+        fire_and_forget(_teardown_meeting(meeting_id, current_user["name"]), "end meeting")
         
-        if is_creator:
-            # Creator is leaving - end meeting for everyone
-            # First notify all participants
-            try:
-                await broadcast_meeting_deleted(meeting_id)
-            except Exception as e:
-                logger.warning(f"Could not broadcast meeting end: {e}")
-            
-            await db.execute("DELETE FROM meeting_participants WHERE meeting_id = ?", (meeting_id,))
-            await db.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,))
-            await db.commit()
-            
-            logger.info(f"Meeting ended by creator: {meeting_id}")
-            return {"message": "Meeting ended for all participants"}
-        else:
-            # Regular participant leaving
+        logger.info(f"Meeting ended by creator: {meeting_id}")
+        return {"message": "Meeting ended for all participants"}
+    else:
+        # Regular participant leaving
+        async with get_db_pool().writer() as db:
             await db.execute(
-                "DELETE FROM meeting_participants WHERE meeting_id = ? AND user_id = ?",
+                SQL_DELETE_PARTICIPANT,
                 (meeting_id, current_user["user_id"])
             )
-            await db.commit()
-            
-            # Notify other participants
-            try:
-                await broadcast_to_room(meeting_id, "participant_left", 
-                                      f"{current_user['name']} left the meeting")
-            except Exception as e:
-                logger.warning(f"Could not broadcast participant leave: {e}")
-            
-            logger.info(f"User left meeting: {current_user['name']} from {meeting_id}")
-            return {"message": "Left meeting successfully"}
-
-@router.delete("/meetings/{meeting_id}")
-async def delete_meeting(meeting_id: str, current_user: dict = Depends(get_current_user)):
-    """Delete meeting (creator only)"""
-    async with aiosqlite.connect(config.get_database_path()) as db:
-        # Check if user is meeting creator
-        async with db.execute(
-            "SELECT name FROM meetings WHERE meeting_id = ? AND creator_user_id = ?", 
-            (meeting_id, current_user["user_id"])
-        ) as cursor:
-            meeting_data = await cursor.fetchone()
-            if not meeting_data:
-                raise HTTPException(status_code=403, detail="Only meeting creator can delete meeting")
         
-        meeting_name = meeting_data[0]
-        
-        # Notify all participants before deletion
-        try:
-            await broadcast_meeting_deleted(meeting_id)
-        except Exception as e:
-            logger.warning(f"Could not broadcast meeting deletion: {e}")
+        # Notify other participants
+        fire_and_forget(broadcast_to_room(meeting_id, "participant_left", 
+                                          f"{current_user['name']} left the meeting"),
+                        "broadcast participant leave")
         
-        # Give a moment for the notification to be sent
-        await asyncio.sleep(0.5)
-        
-        # Delete everything related to the meeting
-        await db.execute("DELETE FROM meeting_participants WHERE meeting_id = ?", (meeting_id,))
-        await db.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting_id,))
-        
-        await db.commit()
+        logger.info(f"User left meeting: {current_user['name']} from {meeting_id}")
+        return {"message": "Left meeting successfully"}
+
+@router.delete("/meetings/{meeting_id}", status_code=202)
+async def delete_meeting(meeting_id: str, background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
+    """Delete meeting (creator only) - accepted immediately, torn down in the background"""
+    # Check if user is meeting creator
+    if await get_meeting_creator(meeting_id) != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Only meeting creator can delete meeting")
     
-    logger.info(f"Meeting deleted: {meeting_name} by {current_user['name']}")
-    return {"message": "Meeting deleted successfully"}
\ No newline at end of file
+    background_tasks.add_task(_teardown_meeting, meeting_id, current_user["name"])
+    return {"message": "Meeting deletion started"}
\ No newline at end of file
@@ -1,12 +1,15 @@
 # routes/team_routes.py - Team Management Routes (Refactored)
 
 from fastapi import APIRouter, HTTPException, Depends
+import asyncio
 import logging
-import aiosqlite
+import aiofiles.os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
-from database import DIContainer, Team, TeamMember
+from database import DIContainer, Team, TeamMember, get_db_pool
 from models import TeamCreate, TeamJoinRequest, AdminAction
-from utils import generate_id, encrypt_data, decrypt_data
+from utils import generate_id, encrypt_data, decrypt_batch, TTLCache, fire_and_forget
 from enhanced_auth import get_current_user
 from websocket_manager import manager
 from config_manager import get_config
@@ -18,6 +21,183 @@ config = get_config()
 # Initialize DI container
 di_container = DIContainer(config.get_database_path())
 
+# Repositories are stateless singletons; resolve them once instead of per request
+team_repo = di_container.get_team_repository()
+team_member_repo = di_container.get_team_member_repository()
+
+# Import WebSocket functions for notifications
+try:
+    from websocket_handlers import (
+        notify_user, broadcast_to_room, broadcast_member_action, force_disconnect_user,
+        broadcast_team_deleted, broadcast_team_chat_cleared
+    )
+except ImportError:
+    logger.warning("WebSocket handlers not available for team notifications")
+    async def notify_user(user_id: str, message_type: str, message: str, **kwargs): pass
+    async def broadcast_to_room(room_id: str, message_type: str, message: str, **kwargs): pass
+    async def broadcast_member_action(team_id: str, action: str, target_user_id: str, admin_name: str): pass
+    async def force_disconnect_user(user_id: str, reason: str = "Admin action"): pass
+    async def broadcast_team_deleted(team_id: str): pass
+    async def broadcast_team_chat_cleared(team_id: str, admin_name: str): pass
+
+# Authorization is part of the WHERE clause so the common case is one round trip
+SQL_TEAM_MEMBERS_FOR_ADMIN = """
+    SELECT u.user_id, u.public_id, u.name, tm.status, tm.requested_at
+    FROM team_members tm
+    JOIN users u ON tm.user_id = u.user_id
+    WHERE tm.team_id = ? AND tm.status IN ('approved', 'banned')
+      AND EXISTS (SELECT 1 FROM teams WHERE team_id = ? AND admin_user_id = ?)
+    ORDER BY tm.requested_at ASC
+"""
+
+# Last 50 messages via the (team_id, created_at) index, returned oldest first
+SQL_RECENT_MESSAGES_FOR_MEMBER = """
+    SELECT r.message, r.message_type, r.created_at, u.user_id, u.public_id, u.name
+    FROM (
+        SELECT id, message, message_type, created_at, user_id
+        FROM team_messages
+        WHERE team_id = ?
+          AND EXISTS (SELECT 1 FROM team_members
+                      WHERE team_id = ? AND user_id = ? AND status = 'approved')
+        ORDER BY created_at DESC, id DESC
+        LIMIT 50
+    ) r
+    JOIN users u ON r.user_id = u.user_id
+    ORDER BY r.created_at ASC, r.id ASC
+"""
+
+SQL_TEAM_FILE_PATHS = "SELECT file_path FROM team_messages WHERE team_id = ? AND file_path IS NOT NULL"
+SQL_DELETE_TEAM_MESSAGES = "DELETE FROM team_messages WHERE team_id = ?"
+
+# Clearing a chat: rows fetched per cursor round trip and unlinks in flight at once
+FILE_PATH_FETCH_SIZE = 256
+FILE_DELETE_CONCURRENCY = 32
+
+async def _remove_chat_file(file_path: str, semaphore: asyncio.Semaphore):
+    """Delete an uploaded chat file; a missing file is not an error"""
+    async with semaphore:
+        try:
+            await aiofiles.os.remove(file_path)
+            logger.info(f"Deleted file: {file_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error deleting file {file_path}: {e}")
+
+# =============================================================================
+# TEAM ADMIN ACTIONS
+# =============================================================================
+
+@dataclass(frozen=True)
+class TeamActionSpec:
+    """How approve_team_request carries out one admin action"""
+    message: str
+    new_status: Optional[str] = None  # None removes the membership row
+    not_found_detail: str = "User is not in this team"
+    required_status: Optional[str] = None
+    wrong_status_detail: str = ""
+    user_event: Optional[str] = None
+    user_message: str = ""
+    user_extra: Dict[str, Any] = field(default_factory=dict)
+    room_event: Optional[str] = None
+    room_message: str = ""
+    disconnect_reason: Optional[str] = None  # kick/ban: announce to the team, then disconnect
+
+TEAM_ADMIN_ACTIONS: Dict[str, TeamActionSpec] = {
+    "approve": TeamActionSpec(
+        message="User approved to join team",
+        new_status="approved",
+        not_found_detail="Join request not found",
+        required_status="pending",
+        wrong_status_detail="Request is not pending",
+        user_event="team_request_approved",
+        user_message="Your request to join the team has been approved!",
+        user_extra={"approved": True},
+        room_event="pending_request_update",
+        room_message="Join request approved for new member",
+    ),
+    "reject": TeamActionSpec(
+        message="User request rejected",
+        new_status="rejected",
+        not_found_detail="Join request not found",
+        required_status="pending",
+        wrong_status_detail="Request is not pending",
+        user_event="team_request_rejected",
+        user_message="Your request to join the team has been rejected.",
+        user_extra={"approved": False},
+        room_event="pending_request_update",
+        room_message="Join request rejected",
+    ),
+    "remove": TeamActionSpec(
+        message="User removed from team",
+        not_found_detail="Join request not found",
+    ),
+    "kick": TeamActionSpec(
+        message="User kicked from team",
+        disconnect_reason="Kicked from team",
+    ),
+    "ban": TeamActionSpec(
+        message="User banned from team",
+        new_status="banned",
+        disconnect_reason="Banned from team",
+    ),
+    # Unban removes the row entirely so the user can request to join again
+    "unban": TeamActionSpec(
+        message="User unbanned from team",
+        required_status="banned",
+        wrong_status_detail="User is not banned from this team",
+        user_event="team_unbanned",
+        user_message="You have been unbanned from the team and can request to join again.",
+    ),
+}
+
+async def _announce_member_removal(team_id: str, action: str, target_user_id: str, admin_name: str, reason: str):
+    """Tell the team about a kick/ban, then disconnect the target (order matters)"""
+    await broadcast_member_action(team_id, action, target_user_id, admin_name)
+    await force_disconnect_user(target_user_id, reason)
+
+# =============================================================================
+# TEAM AUTHORIZATION CACHE
+# =============================================================================
+
+# Admin and membership checks run on nearly every team request but rarely
+# change; short TTLs bound staleness and status-changing routes invalidate
+team_admin_cache = TTLCache(maxsize=10000, ttl=30)
+member_status_cache = TTLCache(maxsize=10000, ttl=30)
+
+async def is_team_admin(team_id: str, user_id: str) -> bool:
+    """Check if user is team admin (admin ID cached per team)"""
+    admin_user_id = team_admin_cache.get(team_id)
+    if admin_user_id is None:
+        team = await team_repo.get_by_id(team_id)
+        if not team:
+            return False
+        admin_user_id = team.admin_user_id
+        team_admin_cache.set(team_id, admin_user_id)
+    return admin_user_id == user_id
+
+async def get_member_status(team_id: str, user_id: str) -> Optional[str]:
+    """Get a user's membership status in a team, or None if not a member"""
+    key = (team_id, user_id)
+    status = member_status_cache.get(key)
+    if status is None:
+        status = await team_member_repo.get_member_status(team_id, user_id)
+        if status:
+            member_status_cache.set(key, status)
+    return status
+
+def invalidate_team_authz(team_id: str, user_id: Optional[str] = None):
+    """Drop cached membership for a user, or the team's admin and every member entry when no user is given"""
+    if user_id is None:
+        team_admin_cache.pop(team_id)
+        member_status_cache.pop_where(lambda key, _: key[0] == team_id)
+    else:
+        member_status_cache.pop((team_id, user_id))
+
+def invalidate_user_authz(user_id: str):
+    """Drop every cached membership of a user (e.g. on account deletion)"""
+    member_status_cache.pop_where(lambda key, _: key[1] == user_id)
+
 # =============================================================================
 # TEAM MANAGEMENT
 # =============================================================================
@@ -26,16 +206,10 @@ di_container = DIContainer(config.get_database_path())
 async def get_user_teams(current_user: dict = Depends(get_current_user)):
     """Get teams for current user using repository pattern"""
     try:
-        team_repo = di_container.get_team_repository()
-        teams = await team_repo.get_user_teams(current_user["user_id"])
-        
-        team_list = []
-        for team in teams:
-            team_data = team.to_dict()
-            team_data["is_admin"] = team.admin_user_id == current_user["user_id"]
-            team_list.append(team_data)
+        user_id = current_user["user_id"]
+        teams = await team_repo.get_user_teams(user_id)
         
-        return team_list
+        return [team.to_dict(user_id) for team in teams]
     except Exception as e:
         logger.error(f"Error getting user teams: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve teams")
@@ -50,10 +224,6 @@ async def create_team(team: TeamCreate, current_user: dict = Depends(get_current
         team_id = generate_id()
         
         # Create team using repository
-        team_repo = di_container.get_team_repository()
-        team_member_repo = di_container.get_team_member_repository()
-        
-        # Create team
         new_team = Team(
             team_id=team_id,
             name=team.name,
@@ -84,16 +254,13 @@ async def create_team(team: TeamCreate, current_user: dict = Depends(get_current
 async def join_team(request: TeamJoinRequest, current_user: dict = Depends(get_current_user)):
     """Request to join a team using repository pattern"""
     try:
-        team_repo = di_container.get_team_repository()
-        team_member_repo = di_container.get_team_member_repository()
-        
         # Check if team exists
         team = await team_repo.get_by_id(request.team_id)
         if not team:
             raise HTTPException(status_code=404, detail="Team not found")
         
         # Check if already a member
-        existing_status = await team_member_repo.get_member_status(request.team_id, current_user["user_id"])
+        existing_status = await get_member_status(request.team_id, current_user["user_id"])
         if existing_status:
             if existing_status == "approved":
                 raise HTTPException(status_code=400, detail="Already a team member")
@@ -109,20 +276,16 @@ async def join_team(request: TeamJoinRequest, current_user: dict = Depends(get_c
         member_added = await team_member_repo.add_member(request.team_id, current_user["user_id"], "pending")
         if not member_added:
             raise HTTPException(status_code=500, detail="Failed to submit join request")
+        invalidate_team_authz(request.team_id, current_user["user_id"])
         
-        # Notify team admin about new join request
-        try:
-            from websocket_handlers import notify_user, broadcast_to_room
-            # Notify the admin specifically
-            await notify_user(team.admin_user_id, "team_join_request", 
-                            f"{current_user['name']} requested to join the team",
-                            team_id=request.team_id, requester=current_user)
-            
-            # Also broadcast to team room for any admins currently online
-            await broadcast_to_room(request.team_id, "pending_request_update", 
-                                  f"New join request from {current_user['name']}")
-        except ImportError:
-            logger.warning("WebSocket handlers not available for join request notification")
+        # Notify the admin specifically
+        await notify_user(team.admin_user_id, "team_join_request", 
+                        f"{current_user['name']} requested to join the team",
+                        team_id=request.team_id, requester=current_user)
+        
+        # Also broadcast to team room for any admins currently online
+        await broadcast_to_room(request.team_id, "pending_request_update", 
+                              f"New join request from {current_user['name']}")
         
         logger.info(f"Team join request: {current_user['name']} -> {request.team_id}")
         return {"message": "Join request sent. Waiting for admin approval."}
@@ -141,11 +304,8 @@ async def join_team(request: TeamJoinRequest, current_user: dict = Depends(get_c
 async def get_team_pending_requests(team_id: str, current_user: dict = Depends(get_current_user)):
     """Get pending join requests for a team (admin only)"""
     try:
-        team_repo = di_container.get_team_repository()
-        team_member_repo = di_container.get_team_member_repository()
-        
         # Check if user is team admin
-        is_admin = await team_repo.is_admin(team_id, current_user["user_id"])
+        is_admin = await is_team_admin(team_id, current_user["user_id"])
         if not is_admin:
             raise HTTPException(status_code=403, detail="Only team admin can view pending requests")
         
@@ -170,40 +330,34 @@ async def get_team_pending_requests(team_id: str, current_user: dict = Depends(g
 async def get_team_members(team_id: str, current_user: dict = Depends(get_current_user)):
     """Get team members list (admin only)"""
     try:
-        team_repo = di_container.get_team_repository()
+        user_id = current_user["user_id"]
         
-        # Check if user is team admin
-        is_admin = await team_repo.is_admin(team_id, current_user["user_id"])
-        if not is_admin:
-            raise HTTPException(status_code=403, detail="Only team admin can view team members")
-        
-        # Get team members - using raw SQL temporarily for complex join
-        # TODO: Add method to get team members with user info to repository
-        async with aiosqlite.connect(config.get_database_path()) as db:
-            async with db.execute("""
-                SELECT u.user_id, u.public_id, u.name, tm.status, tm.requested_at
-                FROM team_members tm
-                JOIN users u ON tm.user_id = u.user_id
-                WHERE tm.team_id = ? AND tm.status IN ('approved', 'banned')
-                ORDER BY tm.requested_at ASC
-            """, (team_id,)) as cursor:
+        # Admin check is folded into the query; rows only come back for the admin
+        async with get_db_pool().reader() as db:
+            async with db.execute(SQL_TEAM_MEMBERS_FOR_ADMIN, (team_id, team_id, user_id)) as cursor:
                 members = await cursor.fetchall()
-                
-                # Get online users from WebSocket manager
-                online_users = manager.get_online_users(team_id)
-                
-                return [
-                    {
-                        "user_id": member[0],
-                        "public_id": member[1], 
-                        "name": member[2],
-                        "status": member[3],
-                        "joined_at": member[4],
-                        "is_admin": member[0] == current_user["user_id"],
-                        "is_online": member[0] in online_users
-                    } for member in members
-                ]
-                
+        
+        # No rows: either not the admin or nothing to list
+        if not members:
+            if not await is_team_admin(team_id, user_id):
+                raise HTTPException(status_code=403, detail="Only team admin can view team members")
+            return []
+        
+        # Get online users from WebSocket manager (a set, so each row check is O(1))
+        online_users = manager.get_online_users(team_id)
+        
+        return [
+            {
+                "user_id": member["user_id"],
+                "public_id": member["public_id"],
+                "name": member["name"],
+                "status": member["status"],
+                "joined_at": member["requested_at"],
+                "is_admin": member["user_id"] == user_id,
+                "is_online": member["user_id"] in online_users
+            } for member in members
+        ]
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -214,150 +368,61 @@ async def get_team_members(team_id: str, current_user: dict = Depends(get_curren
 async def approve_team_request(team_id: str, action: AdminAction, current_user: dict = Depends(get_current_user)):
     """Approve or reject team join request (admin only)"""
     try:
-        team_repo = di_container.get_team_repository()
-        team_member_repo = di_container.get_team_member_repository()
-        
         # Check if user is team admin
-        is_admin = await team_repo.is_admin(team_id, current_user["user_id"])
+        is_admin = await is_team_admin(team_id, current_user["user_id"])
         if not is_admin:
             raise HTTPException(status_code=403, detail="Only team admin can approve requests")
         
-        # Handle kick, ban, and unban actions first (don't require pending status)
-        if action.action in ["kick", "ban", "unban"]:
-            # Check if user exists in team
-            user_status = await team_member_repo.get_member_status(team_id, action.target_user_id)
-            if not user_status:
-                raise HTTPException(status_code=404, detail="User is not in this team")
-            
-            if action.action == "kick":
-                # Kick user from team (immediate removal)
-                removed = await team_member_repo.delete(team_id, action.target_user_id)
-                if not removed:
-                    raise HTTPException(status_code=500, detail="Failed to kick user")
-                
-                # Force disconnect user and broadcast action
-                try:
-                    from websocket_handlers import broadcast_member_action, force_disconnect_user
-                    await broadcast_member_action(team_id, "kick", action.target_user_id, current_user["name"])
-                    await force_disconnect_user(action.target_user_id, "Kicked from team")
-                except ImportError:
-                    logger.warning("WebSocket handlers not available")
-                
-                logger.info(f"User kicked from team: {action.target_user_id} from {team_id}")
-                return {"message": "User kicked from team"}
-                
-            elif action.action == "ban":
-                # Ban user from team (mark as banned)
-                banned = await team_member_repo.update_status(team_id, action.target_user_id, "banned")
-                if not banned:
-                    raise HTTPException(status_code=500, detail="Failed to ban user")
-                
-                # Force disconnect user and broadcast action
-                try:
-                    from websocket_handlers import broadcast_member_action, force_disconnect_user
-                    await broadcast_member_action(team_id, "ban", action.target_user_id, current_user["name"])
-                    await force_disconnect_user(action.target_user_id, "Banned from team")
-                except ImportError:
-                    logger.warning("WebSocket handlers not available")
-                
-                logger.info(f"User banned from team: {action.target_user_id} from {team_id}")
-                return {"message": "User banned from team"}
-                
-            elif action.action == "unban":
-                # Check if user is actually banned
-                if user_status != "banned":
-                    raise HTTPException(status_code=400, detail="User is not banned from this team")
-                
-                # Unban user (remove from team entirely so they can rejoin)
-                unbanned = await team_member_repo.delete(team_id, action.target_user_id)
-                if not unbanned:
-                    raise HTTPException(status_code=500, detail="Failed to unban user")
-                
-                # Notify user about unban
-                try:
-                    from websocket_handlers import notify_user
-                    await notify_user(action.target_user_id, "team_unbanned", 
-                                    f"You have been unbanned from the team and can request to join again.",
-                                    team_id=team_id)
-                except ImportError:
-                    logger.warning("WebSocket handlers not available")
-                
-                logger.info(f"User unbanned from team: {action.target_user_id} from {team_id}")
-                return {"message": "User unbanned from team"}
-        
-        # Handle approve/reject/remove actions (require specific status checks)
-        existing_status = await team_member_repo.get_member_status(team_id, action.target_user_id)
-        if not existing_status:
-            raise HTTPException(status_code=404, detail="Join request not found")
-        
-        # Update status based on action
-        if action.action == "approve":
-            if existing_status != "pending":
-                raise HTTPException(status_code=400, detail="Request is not pending")
-            updated = await team_member_repo.update_status(team_id, action.target_user_id, "approved")
-            
-            # Notify user about approval and broadcast to team
-            try:
-                from websocket_handlers import notify_user, broadcast_to_room
-                await notify_user(action.target_user_id, "team_request_approved", 
-                                f"Your request to join the team has been approved!",
-                                team_id=team_id, approved=True)
-                
-                # Also broadcast to team to refresh pending lists
-                await broadcast_to_room(team_id, "pending_request_update", 
-                                      f"Join request approved for new member")
-            except ImportError:
-                logger.warning("WebSocket handlers not available for approval notification")
-            
-            message = "User approved to join team"
-        elif action.action == "reject":
-            if existing_status != "pending":
-                raise HTTPException(status_code=400, detail="Request is not pending")
-            updated = await team_member_repo.update_status(team_id, action.target_user_id, "rejected")
-            
-            # Notify user about rejection and broadcast to team
-            try:
-                from websocket_handlers import notify_user, broadcast_to_room
-                await notify_user(action.target_user_id, "team_request_rejected", 
-                                f"Your request to join the team has been rejected.",
-                                team_id=team_id, approved=False)
-                
-                # Also broadcast to team to refresh pending lists
-                await broadcast_to_room(team_id, "pending_request_update", 
-                                      f"Join request rejected")
-            except ImportError:
-                logger.warning("WebSocket handlers not available for rejection notification")
-            
-            message = "User request rejected"
-        elif action.action == "remove":
-            # Remove from team entirely
-            updated = await team_member_repo.delete(team_id, action.target_user_id)
-            if updated:
-                logger.info(f"User removed from team: {action.target_user_id} from {team_id}")
-                return {"message": "User removed from team"}
-            else:
-                raise HTTPException(status_code=500, detail="Failed to remove user")
-        else:
+        spec = TEAM_ADMIN_ACTIONS.get(action.action)
+        if spec is None:
             raise HTTPException(status_code=400, detail="Invalid action")
         
-        if not updated:
+        target_user_id = action.target_user_id
+        user_status = await get_member_status(team_id, target_user_id)
+        if not user_status:
+            raise HTTPException(status_code=404, detail=spec.not_found_detail)
+        if spec.required_status and user_status != spec.required_status:
+            raise HTTPException(status_code=400, detail=spec.wrong_status_detail)
+        
+        # Apply the change: drop the membership row or move it to the new status
+        if spec.new_status is None:
+            done = await team_member_repo.delete(team_id, target_user_id)
+        else:
+            done = await team_member_repo.update_status(team_id, target_user_id, spec.new_status)
+        if not done:
             raise HTTPException(status_code=500, detail=f"Failed to {action.action} user")
         
-        logger.info(f"Team request {action.action}: {action.target_user_id} in {team_id}")
-        return {"message": message}
+        # WebSocket side effects run after the response is sent
+        if spec.disconnect_reason:
+            fire_and_forget(_announce_member_removal(team_id, action.action, target_user_id,
+                                                     current_user["name"], spec.disconnect_reason),
+                            f"announce team {action.action}")
+        else:
+            side_effects = []
+            if spec.user_event:
+                side_effects.append(notify_user(target_user_id, spec.user_event, spec.user_message,
+                                                team_id=team_id, **spec.user_extra))
+            if spec.room_event:
+                side_effects.append(broadcast_to_room(team_id, spec.room_event, spec.room_message))
+            if side_effects:
+                fire_and_forget(asyncio.gather(*side_effects), f"notify team {action.action}")
+        
+        logger.info(f"Team admin action {action.action}: {target_user_id} in {team_id}")
+        return {"message": spec.message}
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error processing team action: {e}")
         raise HTTPException(status_code=500, detail="Failed to process team action")
+    finally:
+        # Any action may have changed the target's status
+        invalidate_team_authz(team_id, action.target_user_id)
 
 @router.delete("/teams/{team_id}")
 async def delete_team(team_id: str, current_user: dict = Depends(get_current_user)):
     """Delete team (admin only)"""
     try:
-        team_repo = di_container.get_team_repository()
-        
         # Check if user is team admin and get team info
         team = await team_repo.get_by_id(team_id)
         if not team:
@@ -372,6 +437,7 @@ async def delete_team(team_id: str, current_user: dict = Depends(get_current_use
         deleted = await team_repo.delete(team_id)
         if not deleted:
             raise HTTPException(status_code=500, detail="Failed to delete team")
+        invalidate_team_authz(team_id)
         
         logger.info(f"Team deleted: {team_name} by {current_user['name']}")
         return {"message": "Team deleted successfully"}
@@ -386,9 +452,6 @@ async def delete_team(team_id: str, current_user: dict = Depends(get_current_use
 async def leave_team(team_id: str, current_user: dict = Depends(get_current_user)):
     """Leave team - regular members leave, admin leaving deletes team"""
     try:
-        team_repo = di_container.get_team_repository()
-        team_member_repo = di_container.get_team_member_repository()
-        
         # Check if team exists and get team info
         team = await team_repo.get_by_id(team_id)
         if not team:
@@ -401,23 +464,21 @@ async def leave_team(team_id: str, current_user: dict = Depends(get_current_user
             deleted = await team_repo.delete(team_id)
             if not deleted:
                 raise HTTPException(status_code=500, detail="Failed to delete team")
+            invalidate_team_authz(team_id)
             
             # Broadcast team deletion to all members
-            try:
-                from websocket_handlers import broadcast_team_deleted
-                await broadcast_team_deleted(team_id, team.name)
-            except ImportError:
-                logger.warning("WebSocket handlers not available")
+            await broadcast_team_deleted(team_id)
             
             return {"message": "Team deleted successfully (admin left)"}
         else:
             # Regular member leaving - check if they are actually a member
-            membership_status = await team_member_repo.get_member_status(team_id, current_user["user_id"])
+            membership_status = await get_member_status(team_id, current_user["user_id"])
             if not membership_status:
                 raise HTTPException(status_code=403, detail="Not a team member")
             
             # Remove member from team
             removed = await team_member_repo.delete(team_id, current_user["user_id"])
+            invalidate_team_authz(team_id, current_user["user_id"])
             if not removed:
                 raise HTTPException(status_code=500, detail="Failed to leave team")
             
@@ -437,47 +498,39 @@ async def leave_team(team_id: str, current_user: dict = Depends(get_current_user
 async def get_team_messages(team_id: str, current_user: dict = Depends(get_current_user)):
     """Get chat history for a team"""
     try:
-        team_member_repo = di_container.get_team_member_repository()
-        
-        # Check if user is a member of the team
-        membership_status = await team_member_repo.get_member_status(team_id, current_user["user_id"])
-        if not membership_status or membership_status != "approved":
-            raise HTTPException(status_code=403, detail="Not a team member")
-        
-        # Get recent messages using raw SQL for complex join (TODO: create message repository)
-        async with aiosqlite.connect(config.get_database_path()) as db:
-            # Get recent messages (last 50)
-            async with db.execute("""
-                SELECT tm.message, tm.message_type, tm.created_at, u.user_id, u.public_id, u.name
-                FROM team_messages tm
-                JOIN users u ON tm.user_id = u.user_id
-                WHERE tm.team_id = ?
-                ORDER BY tm.created_at DESC
-                LIMIT 50
-            """, (team_id,)) as cursor:
+        user_id = current_user["user_id"]
+        
+        # Membership check is folded into the query; rows only come back for approved members
+        async with get_db_pool().reader() as db:
+            async with db.execute(SQL_RECENT_MESSAGES_FOR_MEMBER, (team_id, team_id, user_id)) as cursor:
                 messages = await cursor.fetchall()
-                
-                # Decrypt messages and format for return
-                decrypted_messages = []
-                for msg in reversed(messages):  # Reverse to show oldest first
-                    try:
-                        decrypted_message = decrypt_data(msg[0])
-                    except:
-                        decrypted_message = msg[0]  # Fallback if decryption fails
-                    
-                    decrypted_messages.append({
-                        "message": decrypted_message,
-                        "message_type": msg[1],
-                        "timestamp": msg[2],
-                        "user": {
-                            "user_id": msg[3],
-                            "public_id": msg[4],
-                            "name": msg[5]
-                        }
-                    })
-                
-                return decrypted_messages
-                
+        
+        # No rows: either not a member or an empty chat
+        if not messages:
+            membership_status = await get_member_status(team_id, user_id)
+            if membership_status != "approved":
+                raise HTTPException(status_code=403, detail="Not a team member")
+            return []
+        
+        # Decrypt the whole page in one worker-thread hop; decrypt_data falls back
+        # to the stored text on failure
+        plaintexts = await asyncio.to_thread(decrypt_batch, [msg["message"] for msg in messages])
+        
+        decrypted_messages = [
+            {
+                "message": plaintext,
+                "message_type": msg["message_type"],
+                "timestamp": msg["created_at"],
+                "user": {
+                    "user_id": msg["user_id"],
+                    "public_id": msg["public_id"],
+                    "name": msg["name"]
+                }
+            } for msg, plaintext in zip(messages, plaintexts)
+        ]
+        
+        return decrypted_messages
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -488,41 +541,35 @@ async def get_team_messages(team_id: str, current_user: dict = Depends(get_curre
 async def clear_team_chat(team_id: str, current_user: dict = Depends(get_current_user)):
     """Clear all team chat messages (admin only)"""
     try:
-        team_repo = di_container.get_team_repository()
-        
         # Check if user is team admin
-        is_admin = await team_repo.is_admin(team_id, current_user["user_id"])
+        is_admin = await is_team_admin(team_id, current_user["user_id"])
         if not is_admin:
             raise HTTPException(status_code=403, detail="Only team admin can clear chat")
         
-        # Delete all team messages and files - using raw SQL for file operations
-        async with aiosqlite.connect(config.get_database_path()) as db:
-            # Delete all team messages and files
-            async with db.execute(
-                "SELECT file_path FROM team_messages WHERE team_id = ? AND file_path IS NOT NULL",
-                (team_id,)
-            ) as cursor:
-                file_paths = await cursor.fetchall()
-            
-            # Delete physical files
-            import os
-            from pathlib import Path
-            for file_path_row in file_paths:
-                if file_path_row and file_path_row[0]:
-                    file_path = Path(file_path_row[0])
-                    if file_path.exists():
-                        try:
-                            file_path.unlink()
-                            logger.info(f"Deleted file: {file_path}")
-                        except Exception as e:
-                            logger.error(f"Error deleting file {file_path}: {e}")
-            
-            # Delete all messages from database
-            await db.execute("DELETE FROM team_messages WHERE team_id = ?", (team_id,))
-            await db.commit()
+        # Delete physical files before the rows go: stream the paths in chunks and
+        # start each unlink as its row arrives, with bounded concurrency
+        semaphore = asyncio.Semaphore(FILE_DELETE_CONCURRENCY)
+        deletions = []
+        try:
+            async with get_db_pool().reader() as db:
+                async with db.execute(SQL_TEAM_FILE_PATHS, (team_id,)) as cursor:
+                    cursor.arraysize = FILE_PATH_FETCH_SIZE
+                    async for row in cursor:
+                        if row["file_path"]:
+                            deletions.append(asyncio.create_task(_remove_chat_file(row["file_path"], semaphore)))
+        except BaseException:
+            # The rows stay, so cancel deletions that have not started and wait for the rest
+            for deletion in deletions:
+                deletion.cancel()
+            await asyncio.gather(*deletions, return_exceptions=True)
+            raise
+        await asyncio.gather(*deletions)
+        
+        # Delete all messages from database
+        async with get_db_pool().writer() as db:
+            await db.execute(SQL_DELETE_TEAM_MESSAGES, (team_id,))
         
         # Broadcast chat cleared message to all team members
-        from websocket_handlers import broadcast_team_chat_cleared
         await broadcast_team_chat_cleared(team_id, current_user["name"])
         
         logger.info(f"Team chat cleared by admin {current_user['name']} for team {team_id}")
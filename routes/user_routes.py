@@ -4,7 +4,6 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 import logging
 import secrets
 import time
-import aiosqlite
 from datetime import datetime, timedelta
 
 from models import UserRegister, UserLogin, SecretIdRequest
@@ -12,10 +11,13 @@ from services import (
     get_auth_service, get_password_service, 
     LoginRequest, RegisterRequest, AuthResult
 )
-from database import DIContainer
-from enhanced_auth import get_current_user, logout_user
+from database import DIContainer, get_db_pool
+from enhanced_auth import get_current_user, logout_user, invalidate_user_tokens
 from config_manager import get_config
-from utils import verify_password
+from utils import verify_password_async, RateLimiter
+from common_utils import FastJSONResponse
+from routes.team_routes import invalidate_team_authz, invalidate_user_authz
+from routes.meeting_routes import invalidate_meeting_creator
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -25,6 +27,26 @@ DATABASE_PATH = config.get_database_path()
 # Initialize DI container
 di_container = DIContainer(DATABASE_PATH)
 
+# Static SQL kept as module constants so pooled connections reuse their prepared statements
+SQL_USER_PROFILE = "SELECT user_id, public_id, name, created_at FROM users WHERE user_id = ?"
+SQL_USER_PASSWORD_HASH = "SELECT password_hash FROM users WHERE user_id = ?"
+
+# Account deletion cascade; every statement takes the user ID as its only parameter
+SQL_DELETE_USER_CASCADE = (
+    # User-related rows
+    "DELETE FROM team_messages WHERE user_id = ?",
+    "DELETE FROM team_members WHERE user_id = ?",
+    "DELETE FROM meeting_participants WHERE user_id = ?",
+    # Rows of teams where user is admin, set-based rather than per team
+    "DELETE FROM team_members WHERE team_id IN (SELECT team_id FROM teams WHERE admin_user_id = ?)",
+    "DELETE FROM team_messages WHERE team_id IN (SELECT team_id FROM teams WHERE admin_user_id = ?)",
+)
+# Owned teams and meetings report their IDs so in-process caches can be dropped
+# (meeting participants are removed by the trigger)
+SQL_DELETE_OWNED_TEAMS = "DELETE FROM teams WHERE admin_user_id = ? RETURNING team_id"
+SQL_DELETE_OWNED_MEETINGS = "DELETE FROM meetings WHERE creator_user_id = ? RETURNING meeting_id"
+SQL_DELETE_USER = "DELETE FROM users WHERE user_id = ?"
+
 # =============================================================================
 # USER AUTHENTICATION
 # =============================================================================
@@ -66,7 +88,8 @@ async def login(user: UserLogin, request: Request):
         if result.success:
             response_data = result.to_response_dict()
             logger.info(f"Login successful for user: {result.user.public_id}")
-            return response_data
+            # to_response_dict() holds only JSON primitives
+            return FastJSONResponse(response_data)
         else:
             logger.warning(f"Failed login attempt for user: {user.user_id}")
             raise HTTPException(status_code=401, detail=result.error_message)
@@ -95,27 +118,25 @@ async def logout(request: Request, current_user: dict = Depends(get_current_user
 @router.get("/user/profile")
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute(
-            "SELECT user_id, public_id, name, created_at FROM users WHERE user_id = ?",
-            (current_user["user_id"],)
-        ) as cursor:
+    async with get_db_pool().reader() as db:
+        async with db.execute(SQL_USER_PROFILE, (current_user["user_id"],)) as cursor:
             user_data = await cursor.fetchone()
             
             if not user_data:
                 raise HTTPException(status_code=404, detail="User not found")
             
-            return {
-                "user_id": user_data[0],
-                "public_id": user_data[1],
-                "name": user_data[2],
-                "created_at": user_data[3]
-            }
+            # Column names match the response keys
+            return dict(user_data)
 
-# Global storage for nonces to prevent replay attacks
-used_nonces = {}
+# Nonces are recorded in the used_nonces table to prevent replay attacks
 NONCE_EXPIRY_SECONDS = 300  # 5 minutes
 
+SQL_PRUNE_NONCES = "DELETE FROM used_nonces WHERE used_at < ?"
+SQL_CLAIM_NONCE = "INSERT OR IGNORE INTO used_nonces (nonce_key, used_at) VALUES (?, ?)"
+
+# Per-user cap on secret-ID attempts, so one account cannot tie up the hashing threads
+secret_id_limiter = RateLimiter()
+
 @router.post("/user/secret-id")
 async def get_secret_login_id(request: SecretIdRequest, current_user: dict = Depends(get_current_user)):
     """Get user's login ID with strong security verification
@@ -136,34 +157,34 @@ async def get_secret_login_id(request: SecretIdRequest, current_user: dict = Dep
     current_time = time.time()
     user_id = current_user["user_id"]
     
-    # Clean expired nonces
-    expired_keys = [key for key, timestamp in used_nonces.items() if current_time - timestamp > NONCE_EXPIRY_SECONDS]
-    for key in expired_keys:
-        del used_nonces[key]
+    if not secret_id_limiter.is_allowed(user_id, config.get('security.rate_limiting.auth_requests_per_minute', 5)):
+        logger.warning(f"Secret ID rate limit exceeded for user {user_id}")
+        raise HTTPException(status_code=429, detail="Too many requests. Please wait and try again.")
     
-    # Check if nonce was already used
+    # Atomically claim the nonce; an ignored insert means it was already used
     nonce_key = f"{user_id}:{request.nonce}"
-    if nonce_key in used_nonces:
+    async with get_db_pool().writer() as db:
+        await db.execute(SQL_PRUNE_NONCES, (current_time - NONCE_EXPIRY_SECONDS,))
+        cursor = await db.execute(SQL_CLAIM_NONCE, (nonce_key, current_time))
+        claimed = cursor.rowcount == 1
+        await cursor.close()
+    
+    if not claimed:
         logger.warning(f"Replay attack attempt detected for user {user_id}")
         raise HTTPException(status_code=400, detail="Invalid request. Please try again.")
     
-    # Mark nonce as used
-    used_nonces[nonce_key] = current_time
-    
     # Verify password
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute(
-            "SELECT password_hash FROM users WHERE user_id = ?",
-            (user_id,)
-        ) as cursor:
+    async with get_db_pool().reader() as db:
+        async with db.execute(SQL_USER_PASSWORD_HASH, (user_id,)) as cursor:
             user_data = await cursor.fetchone()
-            
-            if not user_data:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            if not verify_password(request.password, user_data[0]):
-                logger.warning(f"Failed secret ID access attempt for user {user_id}")
-                raise HTTPException(status_code=401, detail="Invalid password")
+    
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Password hashing is CPU-bound; verify on the password pool so the event loop keeps running
+    if not await verify_password_async(request.password, user_data["password_hash"]):
+        logger.warning(f"Failed secret ID access attempt for user {user_id}")
+        raise HTTPException(status_code=401, detail="Invalid password")
     
     # Log successful access
     logger.info(f"Secret ID accessed by user {user_id}")
@@ -184,29 +205,25 @@ async def delete_user_account(current_user: dict = Depends(get_current_user)):
     """Delete user account and all associated data"""
     user_id = current_user["user_id"]
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Delete all user-related data
-        await db.execute("DELETE FROM team_messages WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM team_members WHERE user_id = ?", (user_id,))
-        await db.execute("DELETE FROM meeting_participants WHERE user_id = ?", (user_id,))
+    async with get_db_pool().writer() as db:
+        # The writer opens one IMMEDIATE transaction for the whole cascade
+        for statement in SQL_DELETE_USER_CASCADE:
+            await db.execute(statement, (user_id,))
         
-        # Delete teams and meetings where user is admin/creator
-        async with db.execute("SELECT team_id FROM teams WHERE admin_user_id = ?", (user_id,)) as cursor:
-            admin_teams = await cursor.fetchall()
-            for team in admin_teams:
-                await db.execute("DELETE FROM team_members WHERE team_id = ?", (team[0],))
-                await db.execute("DELETE FROM team_messages WHERE team_id = ?", (team[0],))
-                await db.execute("DELETE FROM teams WHERE team_id = ?", (team[0],))
+        async with db.execute(SQL_DELETE_OWNED_TEAMS, (user_id,)) as cursor:
+            team_ids = [row["team_id"] for row in await cursor.fetchall()]
+        async with db.execute(SQL_DELETE_OWNED_MEETINGS, (user_id,)) as cursor:
+            meeting_ids = [row["meeting_id"] for row in await cursor.fetchall()]
         
-        async with db.execute("SELECT meeting_id FROM meetings WHERE creator_user_id = ?", (user_id,)) as cursor:
-            creator_meetings = await cursor.fetchall()
-            for meeting in creator_meetings:
-                await db.execute("DELETE FROM meeting_participants WHERE meeting_id = ?", (meeting[0],))
-                await db.execute("DELETE FROM meetings WHERE meeting_id = ?", (meeting[0],))
-        
-        # Delete user
-        await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-        await db.commit()
+        await db.execute(SQL_DELETE_USER, (user_id,))
+    
+    # Cached tokens and admin/creator/membership lookups for the user, their teams and meetings are now stale
+    invalidate_user_tokens(user_id)
+    invalidate_user_authz(user_id)
+    for team_id in team_ids:
+        invalidate_team_authz(team_id)
+    for meeting_id in meeting_ids:
+        invalidate_meeting_creator(meeting_id)
     
     logger.info(f"User account deleted: {user_id}")
     return {"message": "Account deleted successfully"}
\ No newline at end of file
@@ -3,19 +3,19 @@ Secure Token Management for One-Time File Access
 Prevents replay attacks and unauthorized file access
 """
 
+import heapq
 import time
 import secrets
-import hashlib
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from threading import Lock
 import logging
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class FileAccessToken:
-    """Represents a secure file access token"""
+    """Represents a secure file access token (slotted: no per-instance __dict__)"""
     token: str
     file_id: str
     user_id: str
@@ -27,60 +27,140 @@ class FileAccessToken:
     max_uses: int = 1
     use_count: int = 0
 
+class _TokenShard:
+    """One stripe of the token map with its own lock, revocation indexes and expiry heap"""
+    __slots__ = ("lock", "tokens", "by_user", "by_file", "expiry_heap")
+    
+    def __init__(self):
+        self.lock = Lock()
+        self.tokens: Dict[str, FileAccessToken] = {}
+        self.by_user: Dict[str, Set[str]] = {}  # user_id -> tokens
+        self.by_file: Dict[str, Set[str]] = {}  # file_id -> tokens
+        # (expires_at, token, user_id, file_id); entries of consumed tokens go stale
+        self.expiry_heap: List[Tuple[float, str, str, str]] = []
+    
+    def add(self, access_token: FileAccessToken):
+        """Store a token and index it (caller holds the lock)"""
+        self.tokens[access_token.token] = access_token
+        self.by_user.setdefault(access_token.user_id, set()).add(access_token.token)
+        self.by_file.setdefault(access_token.file_id, set()).add(access_token.token)
+        heapq.heappush(self.expiry_heap, (access_token.expires_at, access_token.token,
+                                          access_token.user_id, access_token.file_id))
+    
+    def unindex(self, access_token: FileAccessToken):
+        """Drop a removed token from the indexes (set.discard is GIL-atomic)"""
+        user_tokens = self.by_user.get(access_token.user_id)
+        if user_tokens is not None:
+            user_tokens.discard(access_token.token)
+        file_tokens = self.by_file.get(access_token.file_id)
+        if file_tokens is not None:
+            file_tokens.discard(access_token.token)
+    
+    def remove(self, token: str) -> Optional[FileAccessToken]:
+        """Remove and unindex a token (safe without the lock: pop/discard are atomic)"""
+        access_token = self.tokens.pop(token, None)
+        if access_token is not None:
+            self.unindex(access_token)
+        return access_token
+    
+    def expire(self, now: float) -> int:
+        """Pop heap entries up to now, removing tokens still stored (caller holds the lock)"""
+        removed = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            _, token, user_id, file_id = heapq.heappop(heap)
+            if self.remove(token) is not None:
+                removed += 1
+            # Drop index sets this token may have emptied
+            if not self.by_user.get(user_id, True):
+                del self.by_user[user_id]
+            if not self.by_file.get(file_id, True):
+                del self.by_file[file_id]
+        return removed
+
 class SecureTokenManager:
-    """Manages secure one-time file access tokens"""
+    """Manages secure one-time file access tokens
+    
+    Tokens are spread over lock-striped shards so operations on different
+    tokens don't serialize on a single lock. State is process-local, which
+    matches the single-worker deployment (see Dockerfile).
+    """
+    
+    SHARD_COUNT = 64  # power of two, so the shard index is a mask
     
     def __init__(self, default_ttl: int = 300):  # 5 minutes default
-        self.tokens: Dict[str, FileAccessToken] = {}
-        self.lock = Lock()
+        self.shards = [_TokenShard() for _ in range(self.SHARD_COUNT)]
+        self._shard_mask = self.SHARD_COUNT - 1
+        self.cleanup_lock = Lock()
         self.default_ttl = default_ttl
         self.cleanup_interval = 60  # Cleanup every minute
         self.last_cleanup = time.time()
     
+    def _shard(self, token: str) -> _TokenShard:
+        """Shard that owns a token"""
+        return self.shards[hash(token) & self._shard_mask]
+    
     def generate_token(self, file_id: str, user_id: str, team_id: str, 
                       access_type: str = "download", ttl: Optional[int] = None,
                       max_uses: int = 1) -> str:
         """Generate a secure one-time access token"""
-        with self.lock:
-            # Generate cryptographically secure token
-            token_bytes = secrets.token_bytes(32)
-            timestamp = str(int(time.time() * 1000))
-            combined = f"{file_id}:{user_id}:{team_id}:{timestamp}".encode()
-            
-            # Create hash to prevent tampering
-            hash_obj = hashlib.sha256(token_bytes + combined)
-            token = hash_obj.hexdigest()
-            
-            # Set expiration
-            now = time.time()
-            expires_at = now + (ttl or self.default_ttl)
-            
-            # Store token
-            access_token = FileAccessToken(
-                token=token,
-                file_id=file_id,
-                user_id=user_id,
-                team_id=team_id,
-                created_at=now,
-                expires_at=expires_at,
-                access_type=access_type,
-                max_uses=max_uses
-            )
-            
-            self.tokens[token] = access_token
-            
-            # Cleanup old tokens periodically
-            if now - self.last_cleanup > self.cleanup_interval:
-                self._cleanup_expired_tokens()
+        # Generate cryptographically secure token (opaque: all bindings live
+        # server-side in FileAccessToken, so hashing them in adds nothing)
+        token = secrets.token_hex(32)
+        
+        # Set expiration
+        now = time.time()
+        expires_at = now + (ttl or self.default_ttl)
+        
+        # Store token
+        access_token = FileAccessToken(
+            token=token,
+            file_id=file_id,
+            user_id=user_id,
+            team_id=team_id,
+            created_at=now,
+            expires_at=expires_at,
+            access_type=access_type,
+            max_uses=max_uses
+        )
+        
+        shard = self._shard(token)
+        with shard.lock:
+            shard.add(access_token)
+        
+        # Cleanup old tokens periodically (one caller at a time, others skip)
+        if now - self.last_cleanup > self.cleanup_interval and self.cleanup_lock.acquire(blocking=False):
+            try:
                 self.last_cleanup = now
-            
-            logger.info(f"Generated {access_type} token for file {file_id} by user {user_id}")
-            return token
+                self._cleanup_expired_tokens()
+            finally:
+                self.cleanup_lock.release()
+        
+        logger.info(f"Generated {access_type} token for file {file_id} by user {user_id}")
+        return token
     
     def validate_and_consume_token(self, token: str) -> Optional[FileAccessToken]:
         """Validate token and mark as used (one-time use)"""
-        with self.lock:
-            access_token = self.tokens.get(token)
+        shard = self._shard(token)
+        
+        # Fast path for single-use tokens: dict.get/pop are atomic under the GIL,
+        # and only one caller can win the pop, so no lock is needed
+        access_token = shard.tokens.get(token)
+        if access_token is not None and access_token.max_uses == 1:
+            if shard.tokens.pop(token, None) is None:
+                logger.warning(f"Token already used: {token[:8]}...")
+                return None
+            shard.unindex(access_token)
+            if time.time() > access_token.expires_at:
+                logger.warning(f"Expired token used: {token[:8]}...")
+                return None
+            access_token.use_count = 1
+            logger.info(f"Token consumed for file {access_token.file_id} by user {access_token.user_id}")
+            return access_token
+        
+        # Multi-use tokens count uses under the shard lock
+        with shard.lock:
+            access_token = shard.tokens.get(token)
             
             if not access_token:
                 logger.warning(f"Token not found: {token[:8]}...")
@@ -91,13 +171,13 @@ class SecureTokenManager:
             # Check if expired
             if now > access_token.expires_at:
                 logger.warning(f"Expired token used: {token[:8]}...")
-                del self.tokens[token]
+                shard.remove(token)
                 return None
             
             # Check if already used up
             if access_token.use_count >= access_token.max_uses:
                 logger.warning(f"Token already used: {token[:8]}...")
-                del self.tokens[token]
+                shard.remove(token)
                 return None
             
             # Mark as used
@@ -105,87 +185,85 @@ class SecureTokenManager:
             
             # Remove if max uses reached
             if access_token.use_count >= access_token.max_uses:
-                del self.tokens[token]
-            
-            logger.info(f"Token consumed for file {access_token.file_id} by user {access_token.user_id}")
-            return access_token
+                shard.remove(token)
+        
+        logger.info(f"Token consumed for file {access_token.file_id} by user {access_token.user_id}")
+        return access_token
     
     def get_token_info(self, token: str) -> Optional[FileAccessToken]:
         """Get token information without consuming it"""
-        with self.lock:
-            return self.tokens.get(token)
+        # A single dict.get is atomic under the GIL
+        return self._shard(token).tokens.get(token)
     
     def revoke_token(self, token: str) -> bool:
         """Revoke a specific token"""
-        with self.lock:
-            if token in self.tokens:
-                del self.tokens[token]
-                logger.info(f"Token revoked: {token[:8]}...")
-                return True
+        # pop + set.discard are each atomic, so no shard lock is needed
+        if self._shard(token).remove(token) is None:
             return False
+        logger.info(f"Token revoked: {token[:8]}...")
+        return True
+    
+    def _revoke_indexed(self, index_name: str, key: str) -> int:
+        """Remove every token filed under key in a shard index, one shard lock at a time"""
+        removed = 0
+        for shard in self.shards:
+            with shard.lock:
+                # list() snapshots atomically; lock-free consumers may still discard
+                matching = list(getattr(shard, index_name).pop(key, ()))
+                for token in matching:
+                    if shard.remove(token) is not None:
+                        removed += 1
+        return removed
     
     def revoke_user_tokens(self, user_id: str) -> int:
         """Revoke all tokens for a specific user"""
-        with self.lock:
-            tokens_to_remove = []
-            for token, access_token in self.tokens.items():
-                if access_token.user_id == user_id:
-                    tokens_to_remove.append(token)
-            
-            for token in tokens_to_remove:
-                del self.tokens[token]
-            
-            logger.info(f"Revoked {len(tokens_to_remove)} tokens for user {user_id}")
-            return len(tokens_to_remove)
+        removed = self._revoke_indexed("by_user", user_id)
+        logger.info(f"Revoked {removed} tokens for user {user_id}")
+        return removed
     
     def revoke_file_tokens(self, file_id: str) -> int:
         """Revoke all tokens for a specific file"""
-        with self.lock:
-            tokens_to_remove = []
-            for token, access_token in self.tokens.items():
-                if access_token.file_id == file_id:
-                    tokens_to_remove.append(token)
-            
-            for token in tokens_to_remove:
-                del self.tokens[token]
-            
-            logger.info(f"Revoked {len(tokens_to_remove)} tokens for file {file_id}")
-            return len(tokens_to_remove)
+        removed = self._revoke_indexed("by_file", file_id)
+        logger.info(f"Revoked {removed} tokens for file {file_id}")
+        return removed
     
     def _cleanup_expired_tokens(self):
         """Remove expired tokens (internal use)"""
         now = time.time()
-        expired_tokens = []
-        
-        for token, access_token in self.tokens.items():
-            if now > access_token.expires_at:
-                expired_tokens.append(token)
+        removed = 0
         
-        for token in expired_tokens:
-            del self.tokens[token]
+        # Cost is proportional to the number of expiries, not the table size
+        for shard in self.shards:
+            with shard.lock:
+                removed += shard.expire(now)
         
-        if expired_tokens:
-            logger.info(f"Cleaned up {len(expired_tokens)} expired tokens")
+        if removed:
+            logger.info(f"Cleaned up {removed} expired tokens")
     
     def get_stats(self) -> Dict:
-        """Get token manager statistics"""
-        with self.lock:
-            now = time.time()
-            active_tokens = 0
-            expired_tokens = 0
-            
-            for access_token in self.tokens.values():
-                if now <= access_token.expires_at:
-                    active_tokens += 1
-                else:
-                    expired_tokens += 1
-            
-            return {
-                "total_tokens": len(self.tokens),
-                "active_tokens": active_tokens,
-                "expired_tokens": expired_tokens,
-                "last_cleanup": self.last_cleanup
-            }
+        """Get token manager statistics (read-only: nothing is expired here)"""
+        now = time.time()
+        total_tokens = 0
+        expired_tokens = 0
+        stale_heap_entries = 0
+        
+        for shard in self.shards:
+            with shard.lock:
+                # list() snapshots atomically; lock-free consumers may still pop
+                tokens = list(shard.tokens.values())
+                heap_size = len(shard.expiry_heap)
+            total_tokens += len(tokens)
+            expired_tokens += sum(1 for access_token in tokens if now > access_token.expires_at)
+            # Every stored token has one heap entry; the rest belong to tokens already removed
+            stale_heap_entries += max(0, heap_size - len(tokens))
+        
+        return {
+            "total_tokens": total_tokens,
+            "active_tokens": total_tokens - expired_tokens,
+            "expired_tokens": expired_tokens,
+            "stale_heap_entries": stale_heap_entries,
+            "last_cleanup": self.last_cleanup
+        }
 
 # Global token manager instance
 token_manager = SecureTokenManager()
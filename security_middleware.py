@@ -4,11 +4,12 @@ import secrets
 import time
 import hashlib
 import hmac
-import json
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Set
-from collections import defaultdict
+from typing import Optional, Deque, Dict, FrozenSet, Set
+from collections import defaultdict, deque
+from functools import lru_cache
+from urllib.parse import urlparse
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -19,6 +20,12 @@ from config_manager import get_config
 logger = logging.getLogger(__name__)
 config = get_config()
 
+# Endpoint sets are built once instead of per request
+AUTH_ENDPOINTS = frozenset({'/api/register', '/api/login'})
+PUBLIC_ENDPOINTS = frozenset({'/health', '/api/csrf-token', '/api/register', '/api/login', '/api/config'})
+JWT_EXEMPT_ENDPOINTS = frozenset({'/api/register', '/api/login', '/api/csrf-token', '/api/config'})
+CSRF_SKIP_PREFIXES = ('/api/files/', '/ws/')
+
 # Global CSRF protection instance - shared across the application
 _csrf_protection_instance = None
 
@@ -49,13 +56,13 @@ class CSRFProtection:
     def generate_token(self) -> str:
         """Generate a cryptographically secure CSRF token"""
         timestamp = str(int(time.time()))
-        random_bytes = secrets.token_bytes(32)
+        random_hex = secrets.token_hex(32)
         
-        # Create HMAC signature
-        message = f"{timestamp}:{random_bytes.hex()}"
-        signature = hmac.new(self.secret_key, message.encode(), hashlib.sha256).hexdigest()
+        # Create HMAC signature (raw digest, hex-encoded only for the wire)
+        message = f"{timestamp}:{random_hex}"
+        signature = hmac.new(self.secret_key, message.encode(), hashlib.sha256).digest()
         
-        token = f"{timestamp}:{random_bytes.hex()}:{signature}"
+        token = f"{message}:{signature.hex()}"
         
         # Store token with expiry from config
         expiry_hours = config.get('security.csrf_protection.token_expiry_hours', 1)
@@ -69,34 +76,14 @@ class CSRFProtection:
     
     def validate_token(self, token: str) -> bool:
         """Validate CSRF token"""
-        if not token or token not in self.tokens:
-            return False
-            
-        # Check if token expired
-        if time.time() > self.tokens[token]:
-            del self.tokens[token]
+        # Only tokens issued by this instance are accepted: the full signed token
+        # string is the key, so membership already implies a valid signature
+        expiry = self.tokens.pop(token, None) if token else None
+        if expiry is None:
             return False
             
-        # Verify HMAC signature
-        try:
-            parts = token.split(':')
-            if len(parts) != 3:
-                return False
-                
-            timestamp, random_hex, signature = parts
-            message = f"{timestamp}:{random_hex}"
-            expected_signature = hmac.new(self.secret_key, message.encode(), hashlib.sha256).hexdigest()
-            
-            if not hmac.compare_digest(signature, expected_signature):
-                return False
-                
-            # Remove token after use (single-use)
-            del self.tokens[token]
-            return True
-            
-        except Exception as e:
-            logger.error(f"CSRF token validation error: {e}")
-            return False
+        # Expired tokens are dropped as well; valid ones are single-use
+        return time.time() <= expiry
     
     def _cleanup_expired_tokens(self):
         """Remove expired tokens"""
@@ -125,8 +112,10 @@ class AntiBotProtection:
             r'insomnia',
             r'httpie'
         ]
+        # One alternation scans the user agent once instead of once per pattern
+        self._bot_re = re.compile("(?:" + "|".join(self.suspicious_patterns) + ")", re.IGNORECASE)
         
-        self.rate_limits: Dict[str, list] = defaultdict(list)  # IP -> [timestamps]
+        self.rate_limits: Dict[str, Deque[float]] = {}  # IP:endpoint -> recent timestamps
         self.blocked_ips: Set[str] = set()
         self.suspicious_ips: Dict[str, int] = defaultdict(int)  # IP -> violation_count
         
@@ -139,12 +128,9 @@ class AntiBotProtection:
         if not user_agent:
             return config.get('security.anti_bot.require_browser_headers', True)
             
-        user_agent_lower = user_agent.lower()
-        
         # Check against known bot patterns
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, user_agent_lower):
-                return True
+        if self._bot_re.search(user_agent):
+            return True
                 
         # Parse user agent for additional checks
         try:
@@ -155,7 +141,7 @@ class AntiBotProtection:
                 return True
                 
             # Check for headless browsers (common in automation)
-            if 'headless' in user_agent_lower:
+            if 'headless' in user_agent.lower():
                 return True
                 
         except:
@@ -168,7 +154,7 @@ class AntiBotProtection:
         suspicious_score = 0
         
         # Check headers
-        headers = dict(request.headers)
+        headers = request.headers
         
         # Missing common browser headers
         expected_headers = ['accept', 'accept-language', 'accept-encoding']
@@ -206,25 +192,29 @@ class AntiBotProtection:
             
         current_time = time.time()
         
-        # Clean old entries
-        key = f"{ip}:{endpoint}"
-        self.rate_limits[key] = [
-            timestamp for timestamp in self.rate_limits[key]
-            if current_time - timestamp < 60  # 1 minute window
-        ]
-        
-        # Add current request
-        self.rate_limits[key].append(current_time)
-        
         # Check limits from config
-        if endpoint in ['/api/register', '/api/login']:
+        if endpoint in AUTH_ENDPOINTS:
             limit = config.get('security.rate_limiting.auth_requests_per_minute', 5)
         elif endpoint.startswith('/api/'):
             limit = config.get('security.rate_limiting.api_requests_per_minute', 30)
         else:
             limit = config.get('security.rate_limiting.static_requests_per_minute', 60)
+        
+        # Only the newest limit + 1 timestamps matter: the window is exceeded
+        # exactly when all of them fall inside it
+        key = f"{ip}:{endpoint}"
+        window = self.rate_limits.get(key)
+        if window is None or window.maxlen != limit + 1:
+            window = self.rate_limits[key] = deque(window or (), maxlen=limit + 1)
+        
+        # Clean old entries (1 minute window)
+        while window and current_time - window[0] >= 60:
+            window.popleft()
+        
+        # Add current request
+        window.append(current_time)
             
-        if len(self.rate_limits[key]) > limit:
+        if len(window) > limit:
             self.suspicious_ips[ip] += 1
             
             # Block IP after multiple violations
@@ -245,17 +235,19 @@ class BrowserValidator:
     def __init__(self):
         # Get allowed origins from config and extract hostnames
         origins = config.get_allowed_origins()
-        self.allowed_origins = set()
+        allowed_origins = set()
         for origin in origins:
             if '://' in origin:
                 hostname = origin.split('://')[1].split(':')[0]
-                self.allowed_origins.add(hostname)
+                allowed_origins.add(hostname)
             else:
-                self.allowed_origins.add(origin)
+                allowed_origins.add(origin)
+        # Frozen so it can key the validation cache
+        self.allowed_origins = frozenset(allowed_origins)
         
     def validate_browser_request(self, request: Request) -> bool:
         """Validate that request comes from a legitimate browser"""
-        headers = dict(request.headers)
+        headers = request.headers
         
         # Check for required browser headers
         if 'user-agent' not in headers:
@@ -282,55 +274,54 @@ class BrowserValidator:
     
     def _validate_origin(self, origin: str) -> bool:
         """Validate request origin"""
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(origin)
-            
-            # Check if it's an allowed domain
-            hostname = parsed.hostname
-            return hostname in self.allowed_origins or hostname.endswith('.localhost')
-            
-        except:
-            return False
+        return _is_allowed_url(origin, self.allowed_origins)
     
     def _validate_referer(self, referer: str) -> bool:
         """Validate request referer"""
-        try:
-            from urllib.parse import urlparse
-            parsed = urlparse(referer)
-            
-            # Check if it's from our application
-            hostname = parsed.hostname
-            return hostname in self.allowed_origins or hostname.endswith('.localhost')
-            
-        except:
-            return False
+        return _is_allowed_url(referer, self.allowed_origins)
+
+@lru_cache(maxsize=2048)
+def _is_allowed_url(url: str, allowed_origins: FrozenSet[str]) -> bool:
+    """Whether a URL's host is one of ours; origins/referers recur, so results are cached"""
+    try:
+        parsed = urlparse(url)
+        
+        # Check if it's an allowed domain
+        hostname = parsed.hostname
+        return hostname in allowed_origins or hostname.endswith('.localhost')
+        
+    except:
+        return False
 
 # =============================================================================
 # JWT ENHANCED SECURITY
 # =============================================================================
 
+@lru_cache(maxsize=4096)
+def _fingerprint_digest(user_agent: str, accept_language: str, accept_encoding: str) -> str:
+    """Hash of the stable browser headers; repeat clients hit the cache"""
+    # Unit separator (\x1f) keeps field boundaries unambiguous
+    fingerprint_str = f"{user_agent}\x1f{accept_language}\x1f{accept_encoding}"
+    return hashlib.sha256(fingerprint_str.encode('utf-8', 'replace')).hexdigest()[:16]
+
 class JWTSecurity:
     def __init__(self, secret_key: str):
         self.secret_key = secret_key
-        self.revoked_tokens: Set[str] = set()
-        self.token_fingerprints: Dict[str, str] = {}  # token_id -> fingerprint
+        self.revoked_tokens: Set[int] = set()
+        self.token_fingerprints: Dict[int, str] = {}  # token_id -> fingerprint
         
     def create_token_fingerprint(self, request: Request) -> str:
         """Create fingerprint for token binding"""
-        headers = dict(request.headers)
+        headers = request.headers
         
         # Create fingerprint from stable browser characteristics
-        fingerprint_data = {
-            'user_agent': headers.get('user-agent', ''),
-            'accept_language': headers.get('accept-language', ''),
-            'accept_encoding': headers.get('accept-encoding', ''),
-        }
-        
-        fingerprint_str = json.dumps(fingerprint_data, sort_keys=True)
-        return hashlib.sha256(fingerprint_str.encode()).hexdigest()[:16]
+        return _fingerprint_digest(
+            headers.get('user-agent', ''),
+            headers.get('accept-language', ''),
+            headers.get('accept-encoding', ''),
+        )
     
-    def validate_token_fingerprint(self, token_id: str, request: Request) -> bool:
+    def validate_token_fingerprint(self, token_id: int, request: Request) -> bool:
         """Validate token fingerprint to prevent token theft"""
         if token_id not in self.token_fingerprints:
             return True  # New token, no fingerprint stored yet
@@ -338,15 +329,15 @@ class JWTSecurity:
         stored_fingerprint = self.token_fingerprints[token_id]
         current_fingerprint = self.create_token_fingerprint(request)
         
-        return stored_fingerprint == current_fingerprint
+        return hmac.compare_digest(stored_fingerprint, current_fingerprint)
     
-    def revoke_token(self, token_id: str):
+    def revoke_token(self, token_id: int):
         """Revoke a token"""
         self.revoked_tokens.add(token_id)
         if token_id in self.token_fingerprints:
             del self.token_fingerprints[token_id]
     
-    def is_token_revoked(self, token_id: str) -> bool:
+    def is_token_revoked(self, token_id: int) -> bool:
         """Check if token is revoked"""
         return token_id in self.revoked_tokens
 
@@ -354,6 +345,17 @@ class JWTSecurity:
 # MAIN SECURITY MIDDLEWARE
 # =============================================================================
 
+# Built once; applied to every response
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+    'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
+    'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data:; connect-src 'self' ws: wss:"
+}
+
 class SecurityMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, secret_key: str):
         super().__init__(app)
@@ -366,9 +368,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         # Get client IP
         client_ip = self._get_client_ip(request)
         
+        path = request.url.path
+        
         # Skip security for public endpoints
-        public_endpoints = ['/health', '/api/csrf-token', '/api/register', '/api/login', '/api/config']
-        if request.url.path in public_endpoints:
+        if path in PUBLIC_ENDPOINTS:
             return await call_next(request)
             
         # Anti-bot protection (only if enabled)
@@ -380,7 +383,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 )
             
         # Browser validation for API endpoints
-        if request.url.path.startswith('/api/'):
+        if path.startswith('/api/'):
             if not self.browser_validator.validate_browser_request(request):
                 return JSONResponse(
                     status_code=status.HTTP_403_FORBIDDEN,
@@ -399,8 +402,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         #             )
                 
         # JWT validation and fingerprinting
-        jwt_exempt_endpoints = ['/api/register', '/api/login', '/api/csrf-token', '/api/config']
-        if request.url.path.startswith('/api/') and request.url.path not in jwt_exempt_endpoints:
+        if path.startswith('/api/') and path not in JWT_EXEMPT_ENDPOINTS:
             if not await self._check_jwt_security(request):
                 return JSONResponse(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -449,8 +451,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     async def _check_csrf_protection(self, request: Request) -> bool:
         """Check CSRF protection"""
         # Skip CSRF for certain endpoints that use other protection
-        skip_csrf_paths = ['/api/files/', '/ws/']
-        if any(request.url.path.startswith(path) for path in skip_csrf_paths):
+        if request.url.path.startswith(CSRF_SKIP_PREFIXES):
             return True
             
         # Get CSRF token from header or form data (case-insensitive)
@@ -490,8 +491,9 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             token = auth_header.split(' ')[1]
             
             # Extract token ID (would need to decode JWT to get jti claim)
-            # For now, use token hash as ID
-            token_id = hashlib.sha256(token.encode()).hexdigest()[:16]
+            # For now, use token hash as ID; it is only an in-process map key,
+            # so the builtin (SipHash) hash is enough
+            token_id = hash(token)
             
             # Check if token is revoked
             if self.jwt_security.is_token_revoked(token_id):
@@ -514,16 +516,5 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     
     def _add_security_headers(self, response):
         """Add security headers to response"""
-        security_headers = {
-            'X-Content-Type-Options': 'nosniff',
-            'X-Frame-Options': 'DENY',
-            'X-XSS-Protection': '1; mode=block',
-            'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
-            'Referrer-Policy': 'strict-origin-when-cross-origin',
-            'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
-            'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data:; connect-src 'self' ws: wss:"
-        }
-        
-        for header, value in security_headers.items():
-            response.headers[header] = value
+        response.headers.update(SECURITY_HEADERS)
 
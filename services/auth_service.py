@@ -3,33 +3,37 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
+from functools import cached_property
 import logging
-from datetime import datetime, timedelta
+import secrets
 
 from database.models import User, IUserRepository
-from utils import hash_password, verify_password, generate_id
+from utils import hash_password, verify_password, password_needs_rehash, generate_id, run_password_task
 from config_manager import get_config
 
 logger = logging.getLogger(__name__)
 config = get_config()
 
+# Access token lifetime reported in login responses; refreshed by init_services()
+ACCESS_TOKEN_EXPIRES_SECONDS = config.get('security.jwt.access_token_expire_minutes', 60) * 60
+
 # =============================================================================
 # DATA TRANSFER OBJECTS
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class LoginRequest:
     """Login request DTO"""
     user_id: str
     password: str
 
-@dataclass 
+@dataclass(slots=True)
 class RegisterRequest:
     """Registration request DTO"""
     name: str
     password: str
 
-@dataclass
+@dataclass(slots=True)
 class AuthResult:
     """Authentication result DTO"""
     success: bool
@@ -45,7 +49,7 @@ class AuthResult:
                 "access_token": self.access_token,
                 "refresh_token": self.refresh_token,
                 "token_type": "bearer",
-                "expires_in": config.get('security.jwt.access_token_expire_minutes', 60) * 60,
+                "expires_in": ACCESS_TOKEN_EXPIRES_SECONDS,
                 "user": self.user.to_safe_dict()
             }
         else:
@@ -93,6 +97,11 @@ class IPasswordService(ABC):
         """Verify password against hash"""
         pass
     
+    @abstractmethod
+    def needs_rehash(self, hashed: str) -> bool:
+        """Check whether a stored hash should be upgraded"""
+        pass
+    
     @abstractmethod
     def validate_password_strength(self, password: str) -> tuple[bool, str]:
         """Validate password meets security requirements"""
@@ -105,6 +114,12 @@ class IPasswordService(ABC):
 class PasswordService(IPasswordService):
     """Password service implementation"""
     
+    def __init__(self):
+        self.min_length = config.get('validation.password_min_length', 4)
+        self.max_length = config.get('validation.password_max_length', 128)
+        self._too_short = (False, f"Password must be at least {self.min_length} characters long")
+        self._too_long = (False, f"Password must be less than {self.max_length} characters long")
+    
     def hash_password(self, password: str) -> str:
         """Hash password using secure algorithm"""
         return hash_password(password)
@@ -113,16 +128,15 @@ class PasswordService(IPasswordService):
         """Verify password against hash"""
         return verify_password(password, hashed)
     
+    def needs_rehash(self, hashed: str) -> bool:
+        """Check whether a stored hash should be upgraded to current Argon2id parameters"""
+        return password_needs_rehash(hashed)
+    
     def validate_password_strength(self, password: str) -> tuple[bool, str]:
         """Validate password meets security requirements"""
-        min_length = config.get('validation.password_min_length', 4)
-        max_length = config.get('validation.password_max_length', 128)
-        
-        if len(password) < min_length:
-            return False, f"Password must be at least {min_length} characters long"
-        
-        if len(password) > max_length:
-            return False, f"Password must be less than {max_length} characters long"
+        length = len(password)
+        if not self.min_length <= length <= self.max_length:
+            return self._too_short if length < self.min_length else self._too_long
         
         # Additional strength checks can be added here
         # For now, we'll keep the basic length requirement
@@ -135,14 +149,30 @@ class AuthService(IAuthService):
     def __init__(self, user_repository: IUserRepository, password_service: IPasswordService):
         self.user_repo = user_repository
         self.password_service = password_service
-        self._jwt_manager = None
+        # Hash of a random password, verified against on unknown user IDs
+        self._dummy_hash: Optional[str] = None
+    
+    async def _run_hash(self, func, *args):
+        """Run a password hash/verify call on the shared password pool"""
+        return await run_password_task(func, *args)
+    
+    async def prepare_dummy_hash(self):
+        """Hash the dummy password up front (init_services) so unknown-ID logins cost one verify"""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self._run_hash(self.password_service.hash_password,
+                                                    secrets.token_urlsafe(32))
     
-    def get_jwt_manager(self):
-        """Lazy load JWT manager to avoid circular imports"""
-        if self._jwt_manager is None:
-            from enhanced_auth import get_jwt_manager
-            self._jwt_manager = get_jwt_manager()
-        return self._jwt_manager
+    async def _dummy_verify(self, password: str):
+        """Spend the same hashing work as a real verify so unknown IDs aren't distinguishable by timing"""
+        # No-op once init_services has run
+        await self.prepare_dummy_hash()
+        await self._run_hash(self.password_service.verify_password, password, self._dummy_hash)
+    
+    @cached_property
+    def jwt_manager(self):
+        """JWT manager, imported on first use to avoid circular imports"""
+        from enhanced_auth import get_jwt_manager
+        return get_jwt_manager()
     
     async def register_user(self, request: RegisterRequest) -> AuthResult:
         """Register a new user"""
@@ -156,34 +186,28 @@ class AuthService(IAuthService):
             user_id = generate_id()
             public_id = generate_id()[:8]
             
-            # Check if user already exists (collision detection)
-            if await self.user_repo.exists(user_id):
-                logger.warning(f"User ID collision detected: {user_id}")
-                return AuthResult(success=False, error_message="Registration failed, please try again")
-            
             # Hash password
-            password_hash = self.password_service.hash_password(request.password)
+            password_hash = await self._run_hash(self.password_service.hash_password, request.password)
             
             # Create user
             user = User(
                 user_id=user_id,
                 public_id=public_id,
                 name=request.name,
-                password_hash=password_hash,
-                created_at=datetime.utcnow()
+                password_hash=password_hash
             )
             
-            # Save to database
-            success = await self.user_repo.create(user)
-            if success:
-                logger.info(f"User registered successfully: {request.name} ({public_id})")
-                return AuthResult(
-                    success=True,
-                    user=user,
-                    error_message=None
-                )
-            else:
-                return AuthResult(success=False, error_message="Registration failed")
+            # Save to database; the insert itself detects ID collisions
+            if not await self.user_repo.create_if_absent(user):
+                logger.warning(f"User ID collision detected: {user_id}")
+                return AuthResult(success=False, error_message="Registration failed, please try again")
+            
+            logger.info(f"User registered successfully: {request.name} ({public_id})")
+            return AuthResult(
+                success=True,
+                user=user,
+                error_message=None
+            )
                 
         except Exception as e:
             logger.error(f"Registration error: {e}")
@@ -199,17 +223,24 @@ class AuthService(IAuthService):
             # Get user by user_id first
             user = await self.user_repo.get_by_id(request.user_id)
             if not user:
+                await self._dummy_verify(request.password)
                 logger.warning(f"Failed login attempt for user: {request.user_id}")
                 return AuthResult(success=False, error_message="Invalid credentials")
             
             # Verify password against stored hash
-            if not self.password_service.verify_password(request.password, user.password_hash):
+            # Hashing is CPU-bound; verify on the hashing pool so the event loop keeps running
+            if not await self._run_hash(self.password_service.verify_password,
+                                        request.password, user.password_hash):
                 logger.warning(f"Failed login attempt for user: {request.user_id}")
                 return AuthResult(success=False, error_message="Invalid credentials")
             
+            # Upgrade legacy/outdated hashes now that we have the plaintext
+            if self.password_service.needs_rehash(user.password_hash):
+                await self._rehash_password(user, request.password)
+            
             # Generate JWT tokens
             user_data = user.to_safe_dict()
-            jwt_manager = self.get_jwt_manager()
+            jwt_manager = self.jwt_manager
             access_token = jwt_manager.create_access_token(user_data, client_request)
             refresh_token = jwt_manager.create_refresh_token(user.user_id)
             
@@ -225,11 +256,20 @@ class AuthService(IAuthService):
             logger.error(f"Authentication error: {e}")
             return AuthResult(success=False, error_message="Authentication failed")
     
+    async def _rehash_password(self, user: User, password: str):
+        """Store a fresh hash for user; a failure here must not block the login"""
+        try:
+            user.password_hash = await self._run_hash(self.password_service.hash_password, password)
+            await self.user_repo.update(user)
+            logger.info(f"Password hash upgraded for user: {user.public_id}")
+        except Exception as e:
+            logger.warning(f"Password rehash failed for user {user.public_id}: {e}")
+    
     async def validate_token(self, token: str, client_request) -> Optional[User]:
         """Validate authentication token"""
         try:
             # Verify JWT token
-            jwt_manager = self.get_jwt_manager()
+            jwt_manager = self.jwt_manager
             payload = jwt_manager.verify_token(token, client_request, "access")
             if not payload:
                 return None
@@ -244,7 +284,6 @@ class AuthService(IAuthService):
                 # User was deleted, blacklist token
                 jti = payload.get("jti")
                 if jti:
-                    jwt_manager = self.get_jwt_manager()
                     jwt_manager.blacklist_token(jti)
                 return None
             
@@ -257,7 +296,7 @@ class AuthService(IAuthService):
     async def logout_user(self, token: str, client_request) -> bool:
         """Logout user and invalidate token"""
         try:
-            jwt_manager = self.get_jwt_manager()
+            jwt_manager = self.jwt_manager
             payload = jwt_manager.verify_token(token, client_request, "access")
             if payload:
                 jti = payload.get("jti")
@@ -279,23 +318,16 @@ class ServiceFactory:
     
     def __init__(self, user_repository: IUserRepository):
         self.user_repository = user_repository
-        self._password_service = None
-        self._auth_service = None
     
-    def get_password_service(self) -> IPasswordService:
-        """Get password service instance"""
-        if self._password_service is None:
-            self._password_service = PasswordService()
-        return self._password_service
+    @cached_property
+    def password_service(self) -> IPasswordService:
+        """Password service instance (created on first access)"""
+        return PasswordService()
     
-    def get_auth_service(self) -> IAuthService:
-        """Get authentication service instance"""
-        if self._auth_service is None:
-            self._auth_service = AuthService(
-                self.user_repository,
-                self.get_password_service()
-            )
-        return self._auth_service
+    @cached_property
+    def auth_service(self) -> IAuthService:
+        """Authentication service instance (created on first access)"""
+        return AuthService(self.user_repository, self.password_service)
 
 # =============================================================================
 # GLOBAL SERVICE INSTANCES
@@ -303,19 +335,21 @@ class ServiceFactory:
 
 _service_factory: Optional[ServiceFactory] = None
 
-def init_services(user_repository: IUserRepository):
+async def init_services(user_repository: IUserRepository):
     """Initialize global service instances"""
-    global _service_factory
+    global _service_factory, ACCESS_TOKEN_EXPIRES_SECONDS
+    ACCESS_TOKEN_EXPIRES_SECONDS = config.get('security.jwt.access_token_expire_minutes', 60) * 60
     _service_factory = ServiceFactory(user_repository)
+    await _service_factory.auth_service.prepare_dummy_hash()
 
 def get_auth_service() -> IAuthService:
     """Get authentication service instance"""
     if _service_factory is None:
         raise RuntimeError("Services not initialized. Call init_services() first.")
-    return _service_factory.get_auth_service()
+    return _service_factory.auth_service
 
 def get_password_service() -> IPasswordService:
     """Get password service instance"""
     if _service_factory is None:
         raise RuntimeError("Services not initialized. Call init_services() first.")
-    return _service_factory.get_password_service()
\ No newline at end of file
+    return _service_factory.password_service
\ No newline at end of file
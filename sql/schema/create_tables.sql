@@ -68,4 +68,33 @@ CREATE TABLE IF NOT EXISTS team_messages (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (team_id) REFERENCES teams (team_id),
     FOREIGN KEY (user_id) REFERENCES users (user_id)
-);
\ No newline at end of file
+);
+
+-- Secret-ID request nonces (anti-replay); rows older than the expiry window are pruned
+CREATE TABLE IF NOT EXISTS used_nonces (
+    nonce_key TEXT PRIMARY KEY,
+    used_at REAL NOT NULL
+);
+
+-- Indexes
+-- (meeting_id, user_id) lookups use the index behind UNIQUE(meeting_id, user_id)
+
+-- Pending join requests per meeting; covers the pending-list query
+CREATE INDEX IF NOT EXISTS idx_mp_meeting_status ON meeting_participants (meeting_id, status, joined_at, user_id);
+
+-- Team members by status in request order; covers the pending-request and member-list lookups
+CREATE INDEX IF NOT EXISTS idx_tm_team_status_time ON team_members (team_id, status, requested_at, user_id);
+
+-- Recent team chat history (newest first, rowid breaks timestamp ties)
+CREATE INDEX IF NOT EXISTS idx_team_messages_team_time ON team_messages (team_id, created_at);
+
+-- Nonce pruning by age
+CREATE INDEX IF NOT EXISTS idx_used_nonces_used_at ON used_nonces (used_at);
+
+-- Triggers
+
+-- Deleting a meeting removes its participants (works on existing databases,
+-- unlike adding ON DELETE CASCADE which would require a table rebuild)
+CREATE TRIGGER IF NOT EXISTS trg_meetings_delete_participants
+BEFORE DELETE ON meetings
+BEGIN DELETE FROM meeting_participants WHERE meeting_id = OLD.meeting_id; END;
\ No newline at end of file
@@ -19,10 +19,26 @@ Usage:
     create_tables = sql.get_schema('create_tables')
 """
 
+import logging
 import os
-from typing import Dict, List, Optional
+import re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 from pathlib import Path
 
+# "-- Description" line naming the query that follows ("-- Params:" lines are notes)
+_QUERY_HEADER_RE = re.compile(r'^[ \t]*-- (?!Params:)[ \t]*(\S.*)$', re.MULTILINE)
+
+# Blank and comment lines (with their newline) plus per-line indentation/trailing space
+_NOISE_RE = re.compile(r'^[ \t]*(?:--.*)?(?:\n|$)|^[ \t]+|[ \t]+$', re.MULTILINE)
+
+# Statement boundary: newline following a line that ends with ';'
+_STATEMENT_END_RE = re.compile(r'(?<=;)\n')
+
+_NO_QUERIES: Mapping[str, str] = MappingProxyType({})
+
+logger = logging.getLogger(__name__)
+
 class SQLLoader:
     """Loads and manages SQL queries from external files."""
     
@@ -39,8 +55,12 @@ class SQLLoader:
         self.queries_dir = self.sql_dir / 'queries'
         self.schema_dir = self.sql_dir / 'schema'
         
-        # Cache for loaded queries
-        self._query_cache: Dict[str, Dict[str, str]] = {}
+        # Scan the directories once: file stem -> path
+        self._query_paths = self._index_sql_files(self.queries_dir)
+        self._schema_paths = self._index_sql_files(self.schema_dir)
+        
+        # Cache for loaded queries (each file's map is read-only once loaded)
+        self._query_cache: Dict[str, Mapping[str, str]] = {}
         self._schema_cache: Dict[str, List[str]] = {}
     
     def get_query(self, file_name: str, query_name: str) -> Optional[str]:
@@ -53,10 +73,12 @@ class SQLLoader:
         Returns:
             The SQL query string, or None if not found
         """
-        queries = self.get_queries(file_name)
-        return queries.get(query_name)
+        try:
+            return self._query_cache[file_name].get(query_name)
+        except KeyError:
+            return self.get_queries(file_name).get(query_name)
     
-    def get_queries(self, file_name: str) -> Dict[str, str]:
+    def get_queries(self, file_name: str) -> Mapping[str, str]:
         """Get all queries from a SQL file.
         
         Args:
@@ -68,7 +90,7 @@ class SQLLoader:
         if file_name not in self._query_cache:
             self._load_queries(file_name)
         
-        return self._query_cache.get(file_name, {})
+        return self._query_cache.get(file_name, _NO_QUERIES)
     
     def get_schema(self, schema_name: str) -> List[str]:
         """Get schema statements from a SQL file.
@@ -84,44 +106,57 @@ class SQLLoader:
         
         return self._schema_cache.get(schema_name, [])
     
+    def preload_all(self) -> None:
+        """Load every query and schema file up front (call once at startup)."""
+        for file_name in self.list_query_files():
+            self._load_queries(file_name)
+        for schema_name in self.list_schema_files():
+            self._load_schema(schema_name)
+    
+    @staticmethod
+    def _index_sql_files(directory: Path) -> Dict[str, Path]:
+        """Map each .sql file stem in directory to its path."""
+        if not directory.exists():
+            return {}
+        
+        return {f.stem: f for f in directory.glob('*.sql')}
+    
     def _load_queries(self, file_name: str) -> None:
         """Load queries from a SQL file and parse them."""
-        sql_file = self.queries_dir / f"{file_name}.sql"
+        sql_file = self._query_paths.get(file_name)
         
-        if not sql_file.exists():
-            print(f"Warning: SQL file not found: {sql_file}")
-            self._query_cache[file_name] = {}
+        if sql_file is None:
+            logger.warning(f"SQL file not found: {self.queries_dir / f'{file_name}.sql'}")
+            self._query_cache[file_name] = _NO_QUERIES
             return
         
         try:
-            with open(sql_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = sql_file.read_text(encoding='utf-8')
             
             queries = self._parse_queries(content)
-            self._query_cache[file_name] = queries
+            self._query_cache[file_name] = MappingProxyType(queries)
             
         except Exception as e:
-            print(f"Error loading SQL file {sql_file}: {e}")
-            self._query_cache[file_name] = {}
+            logger.error(f"Error loading SQL file {sql_file}: {e}")
+            self._query_cache[file_name] = _NO_QUERIES
     
     def _load_schema(self, schema_name: str) -> None:
         """Load schema statements from a SQL file."""
-        sql_file = self.schema_dir / f"{schema_name}.sql"
+        sql_file = self._schema_paths.get(schema_name)
         
-        if not sql_file.exists():
-            print(f"Warning: Schema file not found: {sql_file}")
+        if sql_file is None:
+            logger.warning(f"Schema file not found: {self.schema_dir / f'{schema_name}.sql'}")
             self._schema_cache[schema_name] = []
             return
         
         try:
-            with open(sql_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = sql_file.read_text(encoding='utf-8')
             
             statements = self._parse_schema(content)
             self._schema_cache[schema_name] = statements
             
         except Exception as e:
-            print(f"Error loading schema file {sql_file}: {e}")
+            logger.error(f"Error loading schema file {sql_file}: {e}")
             self._schema_cache[schema_name] = []
     
     def _parse_queries(self, content: str) -> Dict[str, str]:
@@ -130,84 +165,32 @@ class SQLLoader:
         Expects queries to be preceded by comments that describe them.
         """
         queries = {}
-        lines = content.split('\n')
-        current_query = []
-        current_comment = None
-        
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines
-            if not line:
-                continue
-            
-            # Check for comment that describes a query
-            if line.startswith('-- ') and not line.startswith('-- Params:'):
-                # Save previous query if exists
-                if current_comment and current_query:
-                    sql = '\n'.join(current_query).strip()
-                    if sql:
-                        queries[current_comment] = sql
-                
-                # Start new query
-                current_comment = line[3:].strip()  # Remove '-- '
-                current_query = []
-            
-            # Check for SQL statements (not comments)
-            elif not line.startswith('--') and line:
-                current_query.append(line)
+        # split() yields [preamble, name, body, name, body, ...]
+        parts = _QUERY_HEADER_RE.split(content)
         
-        # Save last query
-        if current_comment and current_query:
-            sql = '\n'.join(current_query).strip()
+        for name, body in zip(parts[1::2], parts[2::2]):
+            sql = _NOISE_RE.sub('', body).strip()
             if sql:
-                queries[current_comment] = sql
+                queries[name.strip()] = sql
         
         return queries
     
     def _parse_schema(self, content: str) -> List[str]:
         """Parse schema statements from file content."""
-        # Split by semicolon and clean up
-        statements = []
-        current_statement = []
-        
-        for line in content.split('\n'):
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith('--'):
-                continue
-            
-            current_statement.append(line)
-            
-            # Check if statement is complete (ends with semicolon)
-            if line.endswith(';'):
-                statement = ' '.join(current_statement).strip()
-                if statement:
-                    statements.append(statement)
-                current_statement = []
-        
-        # Add any remaining statement
-        if current_statement:
-            statement = ' '.join(current_statement).strip()
-            if statement:
-                statements.append(statement)
+        # Drop comments/blank lines, then split where a line ends with a semicolon
+        lines = _NOISE_RE.sub('', content).strip()
+        if not lines:
+            return []
         
-        return statements
+        return [statement.replace('\n', ' ') for statement in _STATEMENT_END_RE.split(lines)]
     
     def list_query_files(self) -> List[str]:
         """List all available query files."""
-        if not self.queries_dir.exists():
-            return []
-        
-        return [f.stem for f in self.queries_dir.glob('*.sql')]
+        return list(self._query_paths)
     
     def list_schema_files(self) -> List[str]:
         """List all available schema files."""
-        if not self.schema_dir.exists():
-            return []
-        
-        return [f.stem for f in self.schema_dir.glob('*.sql')]
+        return list(self._schema_paths)
 
 # Global instance for easy access
 sql_loader = SQLLoader()
\ No newline at end of file
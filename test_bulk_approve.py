@@ -0,0 +1,115 @@
+# test_bulk_approve.py - Verify the bulk meeting-approve endpoint
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add current directory to path for testing
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic")
+pytest.importorskip("aiosqlite")
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+import utils
+from database import SqlitePool
+from models import BulkApprove
+from sql_loader import sql_loader
+from routes import meeting_routes
+
+MEETING_ID = "m" * 32
+HOST = {"user_id": "a" * 32, "name": "host"}
+PENDING_1 = "1" * 32
+PENDING_2 = "2" * 32
+APPROVED = "3" * 32
+REJECTED = "4" * 32
+
+def run_bulk_approve(tmp_path, monkeypatch, user_ids, current_user=HOST):
+    """Seed a meeting and call the endpoint; returns (response or HTTPException, notified, statuses)"""
+    notified = []
+
+    async def fake_notify_user(user_id, message_type, message, **kwargs):
+        notified.append(user_id)
+
+    async def scenario():
+        pool = SqlitePool(str(tmp_path / "bulk.db"), readers=1)
+        await pool.open()
+        try:
+            async with pool.writer() as db:
+                for statement in sql_loader.get_schema('create_tables'):
+                    if statement.strip():
+                        await db.execute(statement)
+                for user_id in (HOST["user_id"], PENDING_1, PENDING_2, APPROVED, REJECTED):
+                    await db.execute(
+                        "INSERT INTO users (user_id, public_id, name, password_hash) VALUES (?, ?, ?, ?)",
+                        (user_id, "p" + user_id, "user", "x"),
+                    )
+                await db.execute(meeting_routes.SQL_INSERT_MEETING, (MEETING_ID, "meeting", HOST["user_id"]))
+                for user_id, status in ((HOST["user_id"], "approved"), (PENDING_1, "pending"),
+                                        (PENDING_2, "pending"), (APPROVED, "approved"),
+                                        (REJECTED, "rejected")):
+                    await db.execute(meeting_routes.SQL_INSERT_PARTICIPANT, (MEETING_ID, user_id, status))
+
+            monkeypatch.setattr(meeting_routes, "get_db_pool", lambda: pool)
+            monkeypatch.setattr(meeting_routes, "notify_user", fake_notify_user)
+            meeting_routes.invalidate_meeting_creator(MEETING_ID)
+
+            try:
+                result = await meeting_routes.approve_meeting_requests_bulk(
+                    MEETING_ID, BulkApprove(user_ids=user_ids), current_user
+                )
+            except HTTPException as e:
+                result = e
+            # Wait for the fire-and-forget notifications themselves
+            await asyncio.gather(*utils._background_tasks)
+
+            async with pool.reader() as db:
+                async with db.execute(
+                    "SELECT user_id, status FROM meeting_participants WHERE meeting_id = ?", (MEETING_ID,)
+                ) as cursor:
+                    statuses = {row["user_id"]: row["status"] for row in await cursor.fetchall()}
+            return result, notified, statuses
+        finally:
+            await pool.close()
+            meeting_routes.invalidate_meeting_creator(MEETING_ID)
+
+    return asyncio.run(scenario())
+
+def test_only_pending_users_are_approved_and_notified(tmp_path, monkeypatch):
+    result, notified, statuses = run_bulk_approve(
+        tmp_path, monkeypatch, [PENDING_1, APPROVED, REJECTED, PENDING_2]
+    )
+    assert sorted(result["approved"]) == [PENDING_1, PENDING_2]
+    assert sorted(notified) == [PENDING_1, PENDING_2]
+    assert statuses[PENDING_1] == statuses[PENDING_2] == "approved"
+    assert statuses[REJECTED] == "rejected"
+
+def test_duplicate_ids_are_approved_once(tmp_path, monkeypatch):
+    result, notified, _ = run_bulk_approve(
+        tmp_path, monkeypatch, [PENDING_1, PENDING_1, PENDING_1.upper()]
+    )
+    assert result["approved"] == [PENDING_1]
+    assert notified == [PENDING_1]
+
+def test_non_host_is_forbidden(tmp_path, monkeypatch):
+    result, notified, statuses = run_bulk_approve(
+        tmp_path, monkeypatch, [PENDING_1], current_user={"user_id": APPROVED, "name": "guest"}
+    )
+    assert isinstance(result, HTTPException) and result.status_code == 403
+    assert notified == []
+    assert statuses[PENDING_1] == "pending"
+
+@pytest.mark.parametrize("count", [0, 101])
+def test_id_count_out_of_range_is_rejected(count):
+    with pytest.raises(ValidationError):
+        BulkApprove(user_ids=[f"{i:032x}" for i in range(count)])
+
+@pytest.mark.parametrize("user_id", ["1" * 33, "1" * 31, "g" * 32, "1" * 31 + "\n", "1" * 32 + "\n"])
+def test_malformed_ids_are_rejected(user_id):
+    with pytest.raises(ValidationError):
+        BulkApprove(user_ids=[user_id])
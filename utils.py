@@ -1,5 +1,6 @@
 # Enhanced utils.py - Utility Functions with Better Security and GDPR Compliance
 
+import asyncio
 import hashlib
 import secrets
 import mimetypes
@@ -8,13 +9,16 @@ import re
 import hmac
 import base64
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from pathlib import Path
-from typing import Union, Optional, Dict, List, Tuple
+from typing import Any, Awaitable, Callable, Union, Optional, Dict, List, Tuple
 import bleach
 import ipaddress
 
@@ -42,19 +46,20 @@ def get_or_create_encryption_key() -> bytes:
 ENCRYPTION_KEY = get_or_create_encryption_key()
 fernet = Fernet(ENCRYPTION_KEY)
 
+@lru_cache(maxsize=32)
+def _get_fernet(key: Optional[bytes] = None) -> Fernet:
+    """Fernet instance for key (default key when None), built once per key"""
+    return Fernet(key) if key else fernet
+
 # Additional encryption for sensitive data
-def generate_key_from_password(password: str, salt: bytes = None) -> Tuple[bytes, bytes]:
+def generate_key_from_password(password: str, salt: bytes = None,
+                               iterations: int = 100000) -> Tuple[bytes, bytes]:
     """Generate encryption key from password using PBKDF2"""
     if salt is None:
         salt = os.urandom(16)
     
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    derived = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=32)
+    key = base64.urlsafe_b64encode(derived)
     return key, salt
 
 # RSA key pair for additional security (optional)
@@ -83,8 +88,34 @@ def generate_rsa_keypair() -> Tuple[bytes, bytes]:
 # PASSWORD SECURITY
 # =============================================================================
 
-def hash_password(password: str, salt: bytes = None) -> str:
-    """Enhanced password hashing with salt"""
+# Argon2id (OWASP parameters); PBKDF2 hashes from before the switch still verify
+# and are upgraded on the next successful login
+try:
+    from argon2 import PasswordHasher, Type
+    from argon2.exceptions import InvalidHashError, VerificationError
+    _argon2_hasher = PasswordHasher(time_cost=3, memory_cost=46 * 1024, parallelism=1, type=Type.ID)
+except ImportError:
+    logger.warning("argon2-cffi not installed, hashing passwords with PBKDF2")
+    _argon2_hasher = None
+
+ARGON2_PREFIX = "$argon2"
+
+# Optional short-lived cache of successful verifications, off by default. The only
+# callers (login and the secret-id re-check) are rate-limited on purpose and
+# WebSocket auth uses JWTs, so it saves little; while enabled, a repeat of a
+# recently verified password skips the KDF cost for 60 seconds. Only successes are
+# cached, keyed by a per-process keyed BLAKE2b, never the password itself.
+# Set PASSWORD_VERIFY_CACHE=1 to enable.
+PASSWORD_VERIFY_CACHE_ENABLED = os.getenv('PASSWORD_VERIFY_CACHE', '0') == '1'
+_VERIFY_CACHE_KEY = secrets.token_bytes(32)
+
+def _verify_cache_key(password: str, hashed: str) -> bytes:
+    """Opaque cache key for a (password, stored hash) pair"""
+    data = password.encode('utf-8') + b'\x00' + hashed.encode('utf-8')
+    return hashlib.blake2b(data, key=_VERIFY_CACHE_KEY, digest_size=16).digest()
+
+def _hash_password_pbkdf2(password: str, salt: bytes = None) -> str:
+    """Legacy PBKDF2-SHA256 hash: base64(salt + hash)"""
     if salt is None:
         salt = os.urandom(32)
     
@@ -94,9 +125,38 @@ def hash_password(password: str, salt: bytes = None) -> str:
     # Combine salt and hash
     return base64.b64encode(salt + pwdhash).decode('ascii')
 
+def hash_password(password: str, salt: bytes = None) -> str:
+    """Enhanced password hashing with salt (Argon2id when available)"""
+    if _argon2_hasher is None or salt is not None:
+        return _hash_password_pbkdf2(password, salt)
+    return _argon2_hasher.hash(password)
+
 def verify_password(password: str, hashed: str) -> bool:
     """Verify password against hash"""
+    if not PASSWORD_VERIFY_CACHE_ENABLED:
+        return _verify_password_uncached(password, hashed)
+    
+    cache_key = _verify_cache_key(password, hashed)
+    if _verified_password_cache.get(cache_key):
+        return True
+    
+    verified = _verify_password_uncached(password, hashed)
+    if verified:
+        _verified_password_cache.set(cache_key, True)
+    return verified
+
+def _verify_password_uncached(password: str, hashed: str) -> bool:
+    """Run the KDF for verify_password"""
     try:
+        if hashed.startswith(ARGON2_PREFIX):
+            if _argon2_hasher is None:
+                logger.error("Argon2 password hash found but argon2-cffi is not installed")
+                return False
+            try:
+                return _argon2_hasher.verify(hashed, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        
         # Decode the stored hash
         decoded = base64.b64decode(hashed.encode('ascii'))
         salt = decoded[:32]
@@ -111,6 +171,46 @@ def verify_password(password: str, hashed: str) -> bool:
         logger.error(f"Password verification error: {e}")
         return False
 
+def password_needs_rehash(hashed: str) -> bool:
+    """Whether a stored hash is legacy PBKDF2 or uses outdated Argon2 parameters"""
+    if _argon2_hasher is None:
+        return False
+    if not hashed.startswith(ARGON2_PREFIX):
+        return True
+    try:
+        return _argon2_hasher.check_needs_rehash(hashed)
+    except Exception:
+        return False
+
+# Password hashing is CPU- and memory-heavy (46 MiB per Argon2 call), so async callers
+# run it on a dedicated pool sized to the CPUs; the semaphore caps queued work
+_PASSWORD_WORKERS = os.cpu_count() or 4
+_password_pool = ThreadPoolExecutor(max_workers=_PASSWORD_WORKERS, thread_name_prefix="pwhash")
+_password_slots = asyncio.Semaphore(_PASSWORD_WORKERS * 2)
+
+async def run_password_task(func, *args):
+    """Run a blocking hash/verify/KDF call on the password pool"""
+    async with _password_slots:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, func, *args)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """verify_password without blocking the event loop (cache hits skip the pool)"""
+    if PASSWORD_VERIFY_CACHE_ENABLED and _verified_password_cache.get(_verify_cache_key(password, hashed)):
+        return True
+    return await run_password_task(verify_password, password, hashed)
+
+_LOWERCASE_RE = re.compile(r"[a-z]")
+_UPPERCASE_RE = re.compile(r"[A-Z]")
+_DIGIT_RE = re.compile(r"\d")
+_SPECIAL_CHAR_RE = re.compile(r"[!@#$%^&*(),.?\":{}|<>]")
+
+# Lowercase; compared against password.lower()
+_COMMON_PASSWORDS = frozenset({
+    "password", "password1", "password123", "123456", "12345678", "123456789",
+    "1234567890", "111111", "123123", "abc123", "admin", "qwerty", "qwerty123",
+    "letmein", "welcome", "iloveyou", "monkey", "dragon", "football", "baseball",
+})
+
 def check_password_strength(password: str) -> Dict[str, any]:
     """Check password strength and provide feedback"""
     result = {
@@ -127,32 +227,31 @@ def check_password_strength(password: str) -> Dict[str, any]:
         result["score"] += 1
     
     # Character variety checks
-    if not re.search(r"[a-z]", password):
+    if not _LOWERCASE_RE.search(password):
         result["is_strong"] = False
         result["feedback"].append("Password must contain lowercase letters")
     else:
         result["score"] += 1
     
-    if not re.search(r"[A-Z]", password):
+    if not _UPPERCASE_RE.search(password):
         result["is_strong"] = False
         result["feedback"].append("Password must contain uppercase letters")
     else:
         result["score"] += 1
     
-    if not re.search(r"\d", password):
+    if not _DIGIT_RE.search(password):
         result["is_strong"] = False
         result["feedback"].append("Password must contain numbers")
     else:
         result["score"] += 1
     
-    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+    if not _SPECIAL_CHAR_RE.search(password):
         result["feedback"].append("Consider adding special characters for stronger security")
     else:
         result["score"] += 1
     
     # Common password check (basic)
-    common_passwords = ["password", "123456", "password123", "admin", "qwerty"]
-    if password.lower() in common_passwords:
+    if password.lower() in _COMMON_PASSWORDS:
         result["is_strong"] = False
         result["feedback"].append("Password is too common")
     
@@ -168,8 +267,7 @@ def encrypt_data(data: str, key: bytes = None) -> str:
         if not data:
             return ""
         
-        encryption_key = key or ENCRYPTION_KEY
-        f = Fernet(encryption_key) if key else fernet
+        f = _get_fernet(key)
         
         # Add timestamp and random padding for additional security
         timestamp = datetime.now().isoformat()
@@ -188,8 +286,7 @@ def decrypt_data(encrypted_data: str, key: bytes = None) -> str:
         if not encrypted_data:
             return ""
         
-        encryption_key = key or ENCRYPTION_KEY
-        f = Fernet(encryption_key) if key else fernet
+        f = _get_fernet(key)
         
         # Handle both old and new encryption formats
         try:
@@ -224,14 +321,17 @@ def decrypt_data(encrypted_data: str, key: bytes = None) -> str:
         logger.error(f"Decryption error: {e}")
         return encrypted_data  # Return original if decryption fails
 
+def decrypt_batch(encrypted_items: List[str]) -> List[str]:
+    """Decrypt many values in one call (run it in a worker thread for large batches)"""
+    return [decrypt_data(item) for item in encrypted_items]
+
 def encrypt_file(file_path: str, key: bytes = None) -> bool:
     """Encrypt a file in place"""
     try:
         with open(file_path, 'rb') as f:
             data = f.read()
         
-        encryption_key = key or ENCRYPTION_KEY
-        f_cipher = Fernet(encryption_key) if key else fernet
+        f_cipher = _get_fernet(key)
         
         encrypted_data = f_cipher.encrypt(data)
         
@@ -251,6 +351,9 @@ def encrypt_file(file_path: str, key: bytes = None) -> bool:
 # INPUT VALIDATION AND SANITIZATION
 # =============================================================================
 
+# Control characters other than tab/newline/carriage return, dropped by str.translate
+_CONTROL_CHARS = dict.fromkeys((c for c in range(32) if c not in (9, 10, 13)), None)
+
 def sanitize_input(text: str, max_length: int = 1000, allow_html: bool = False) -> str:
     """Enhanced input sanitization"""
     if not text:
@@ -272,7 +375,7 @@ def sanitize_input(text: str, max_length: int = 1000, allow_html: bool = False)
         text = bleach.clean(text, tags=allowed_tags, attributes={}, strip=True)
     
     # Remove null bytes and other control characters
-    text = ''.join(char for char in text if ord(char) >= 32 or char in '\n\r\t')
+    text = text.translate(_CONTROL_CHARS)
     
     # Additional XSS protection
     text = text.replace('<script', '&lt;script')
@@ -281,10 +384,11 @@ def sanitize_input(text: str, max_length: int = 1000, allow_html: bool = False)
     
     return text
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 def validate_user_id(user_id: str) -> bool:
     """Enhanced user ID validation"""
@@ -332,6 +436,22 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_EXTENSIONS = {'.txt', '.pdf', '.doc', '.docx', '.jpg', '.jpeg', '.png', '.gif', '.mp3', '.mp4', '.avi', '.webm'}
 BLOCKED_EXTENSIONS = {'.exe', '.zip', '.rar', '.7z', '.bat', '.cmd', '.com', '.scr', '.pif', '.js', '.vbs', '.ps1'}
 
+EXECUTABLE_SIGNATURES = (
+    b'MZ',  # Windows PE
+    b'\x7fELF',  # Linux ELF
+    b'\xca\xfe\xba\xbe',  # Mach-O
+    b'PK',  # ZIP archives
+)
+
+# Script content in supposedly safe files, matched case-insensitively in one scan
+SCRIPT_CHECK_EXTENSIONS = frozenset({'.txt', '.pdf', '.doc', '.docx'})
+_SCRIPT_CONTENT_RE = re.compile(rb'<script|javascript:|data:|vbscript:', re.IGNORECASE)
+
+# Only the leading bytes are inspected for script content, keeping the check constant-cost
+# per upload. Content past this window is not checked here; full scanning belongs to an
+# antivirus layer.
+SCAN_WINDOW = 8192
+
 def is_safe_file(filename: str, file_content: bytes = None) -> Dict[str, any]:
     """Enhanced file safety check"""
     result = {
@@ -347,8 +467,8 @@ def is_safe_file(filename: str, file_content: bytes = None) -> Dict[str, any]:
         return result
     
     # Sanitize filename
-    filename = Path(filename).name
-    ext = Path(filename).suffix.lower()
+    filename = os.path.basename(filename)
+    ext = os.path.splitext(filename)[1].lower()
     
     # Check blocked extensions first
     if ext in BLOCKED_EXTENSIONS:
@@ -379,46 +499,33 @@ def is_safe_file(filename: str, file_content: bytes = None) -> Dict[str, any]:
     # Additional content checks
     if file_content:
         # Check for executable signatures
-        executable_signatures = [
-            b'MZ',  # Windows PE
-            b'\x7fELF',  # Linux ELF
-            b'\xca\xfe\xba\xbe',  # Mach-O
-            b'PK',  # ZIP archives
-        ]
-        
-        for sig in executable_signatures:
-            if file_content.startswith(sig):
-                result["is_safe"] = False
-                result["reasons"].append("File appears to be executable or archive")
-                break
+        if file_content.startswith(EXECUTABLE_SIGNATURES):
+            result["is_safe"] = False
+            result["reasons"].append("File appears to be executable or archive")
         
         # Check for script content in supposedly safe files
-        if ext in {'.txt', '.pdf', '.doc', '.docx'}:
-            script_patterns = [b'<script', b'javascript:', b'data:', b'vbscript:']
-            content_lower = file_content.lower()
-            
-            for pattern in script_patterns:
-                if pattern in content_lower:
-                    result["is_safe"] = False
-                    result["reasons"].append("File contains potentially malicious script content")
-                    break
+        if ext in SCRIPT_CHECK_EXTENSIONS and _SCRIPT_CONTENT_RE.search(file_content, 0, SCAN_WINDOW):
+            result["is_safe"] = False
+            result["reasons"].append("File contains potentially malicious script content")
     
     return result
 
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe storage"""
     if not filename:
         return "unknown_file"
     
     # Remove path components
-    filename = Path(filename).name
+    filename = os.path.basename(filename)
     
     # Remove potentially dangerous characters
-    filename = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', filename)
+    filename = _UNSAFE_FILENAME_CHARS_RE.sub('_', filename)
     
     # Limit length
     if len(filename) > 255:
-        name, ext = Path(filename).stem, Path(filename).suffix
+        name, ext = os.path.splitext(filename)
         filename = name[:255-len(ext)] + ext
     
     # Ensure filename doesn't start with dot (hidden files)
@@ -437,7 +544,7 @@ def get_safe_upload_path(filename: str, upload_dir: str = "uploads") -> str:
     
     # Add timestamp to prevent conflicts
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    name, ext = Path(safe_filename).stem, Path(safe_filename).suffix
+    name, ext = os.path.splitext(safe_filename)
     unique_filename = f"{timestamp}_{secrets.token_hex(4)}_{name}{ext}"
     
     return os.path.join(upload_dir, unique_filename)
@@ -467,32 +574,114 @@ def generate_api_key() -> str:
 # =============================================================================
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """Simple in-memory rate limiter (sliding window, LRU-bounded identifiers)"""
     
-    def __init__(self):
-        self.requests = {}
+    def __init__(self, max_identifiers: int = 10000):
+        self.max_identifiers = max_identifiers
+        # identifier -> deque of monotonic timestamps, oldest first
+        self.requests: OrderedDict = OrderedDict()
     
     def is_allowed(self, identifier: str, limit: int, window: int = 60) -> bool:
         """Check if request is allowed under rate limit"""
-        now = datetime.now()
+        now = time.monotonic()
         
-        # Clean old entries
-        if identifier in self.requests:
-            self.requests[identifier] = [
-                timestamp for timestamp in self.requests[identifier]
-                if (now - timestamp).total_seconds() < window
-            ]
+        timestamps = self.requests.get(identifier)
+        if timestamps is None:
+            timestamps = self.requests[identifier] = deque()
+            # Forget the least recently seen identifier when full
+            if len(self.requests) > self.max_identifiers:
+                self.requests.popitem(last=False)
         else:
-            self.requests[identifier] = []
+            self.requests.move_to_end(identifier)
+        
+        # Clean old entries
+        while timestamps and now - timestamps[0] >= window:
+            timestamps.popleft()
         
         # Check limit
-        if len(self.requests[identifier]) >= limit:
+        if len(timestamps) >= limit:
             return False
         
         # Add current request
-        self.requests[identifier].append(now)
+        timestamps.append(now)
         return True
 
+# =============================================================================
+# CACHING UTILITIES
+# =============================================================================
+
+class TTLCache:
+    """Simple in-memory LRU cache with per-entry expiry"""
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: Any, value: Any):
+        """Store value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def pop(self, key: Any, default: Any = None) -> Any:
+        """Remove and return cached value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+    
+    def pop_where(self, predicate: Callable[[Any, Any], bool]) -> int:
+        """Remove every entry for which predicate(key, value) is true; returns how many were removed"""
+        with self._lock:
+            stale = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+    
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+# Recently verified password/hash pairs (see verify_password)
+_verified_password_cache = TTLCache(maxsize=1024, ttl=60)
+
+# =============================================================================
+# BACKGROUND TASKS
+# =============================================================================
+
+# Strong references so pending tasks aren't garbage collected mid-flight
+_background_tasks = set()
+
+def fire_and_forget(coro: Awaitable, description: str = "run background task") -> asyncio.Future:
+    """Schedule a best-effort coroutine (or gather) without awaiting it; failures are logged"""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    
+    def _on_done(done: asyncio.Future):
+        _background_tasks.discard(done)
+        if not done.cancelled() and done.exception() is not None:
+            logger.warning(f"Could not {description}: {done.exception()}")
+    
+    task.add_done_callback(_on_done)
+    return task
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
@@ -543,6 +732,20 @@ def mask_sensitive_data(data: str, mask_char: str = "*", visible_chars: int = 4)
     
     return data[:visible_chars] + mask_char * (len(data) - visible_chars)
 
+# Random bytes for audit correlation IDs, refilled in bulk rather than per log line
+_AUDIT_ID_REFILL = 4096
+_audit_id_buffer = bytearray()
+_audit_id_lock = threading.Lock()
+
+def _audit_correlation_id(nbytes: int = 6) -> str:
+    """Short random ID to correlate audit entries (not a security token)"""
+    with _audit_id_lock:
+        if len(_audit_id_buffer) < nbytes:
+            _audit_id_buffer.extend(os.urandom(_AUDIT_ID_REFILL))
+        chunk = bytes(_audit_id_buffer[-nbytes:])
+        del _audit_id_buffer[-nbytes:]
+    return base64.urlsafe_b64encode(chunk).decode('ascii')
+
 def generate_audit_log_entry(
     user_id: str,
     action: str,
@@ -562,7 +765,7 @@ def generate_audit_log_entry(
         "user_agent": mask_sensitive_data(user_agent, visible_chars=20),
         "success": success,
         "details": details or {},
-        "session_id": generate_session_token()[:8]  # Short session identifier
+        "session_id": _audit_correlation_id()  # Short correlation identifier
     }
 
 # =============================================================================
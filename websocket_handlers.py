@@ -392,6 +392,15 @@ async def notify_user(user_id: str, message_type: str, message: str, **kwargs):
     # Also send using the old method for backward compatibility
     return await manager.send_to_user(user_id, message_data)
 
+async def notify_user_and_room(user_id: str, room_id: str,
+                               user_message_type: str, user_message: str,
+                               room_message_type: str, room_message: str):
+    """Notify a user and broadcast to a room in one call, sending both concurrently"""
+    await asyncio.gather(
+        notify_user(user_id, user_message_type, user_message),
+        broadcast_to_room(room_id, room_message_type, room_message)
+    )
+
 async def broadcast_meeting_deleted(meeting_id: str):
     """Broadcast meeting deletion to all participants"""
     await broadcast_to_room(meeting_id, "meeting_deleted", 
@@ -4,13 +4,16 @@ from fastapi import WebSocket, WebSocketDisconnect
 import json
 import asyncio
 import logging
-from typing import Dict, Set, List, Optional, Any
+from typing import AbstractSet, Dict, FrozenSet, Set, List, Optional, Any
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Shared result for rooms with nobody online (avoids allocating a set per lookup)
+NO_ONLINE_USERS: FrozenSet[str] = frozenset()
+
 @dataclass
 class UserConnection:
     """Represents a user connection with metadata"""
@@ -590,13 +593,13 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
 
-    def get_online_users(self, room_id: str) -> Set[str]:
-        """Get set of online user IDs for a room"""
-        return self.online_users.get(room_id, set())
+    def get_online_users(self, room_id: str) -> AbstractSet[str]:
+        """Get set of online user IDs for a room (live view; copy before awaiting)"""
+        return self.online_users.get(room_id, NO_ONLINE_USERS)
     
     def is_user_online(self, room_id: str, user_id: str) -> bool:
         """Check if a specific user is online in a room"""
-        return user_id in self.online_users.get(room_id, set())
+        return user_id in self.online_users.get(room_id, NO_ONLINE_USERS)
     
     async def broadcast_online_users_update(self, room_id: str):
         """Broadcast updated online users list to room participants"""